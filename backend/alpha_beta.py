@@ -1,23 +1,82 @@
-from state import Connect4State
+from state import Connect4State, mirror_move
+from transposition import EXACT, LOWER, UPPER
+from context import SearchContext
+from stats import evaluate
 
 INF = 1e18
-K = 10
 
-def minimax(board, depth = K):
-    state = Connect4State(board, 1, None, None, -INF, INF)
-    value, action, expanded = max_value(state, depth, -INF, INF)
+def minimax(board, ctx: SearchContext = None):
+    if ctx is None:
+        ctx = SearchContext()
+    state = ctx.root(board, -INF, INF)
+    if ctx.orderer is not None:
+        ctx.orderer.start(ctx.depth)
+    if ctx.stats is not None:
+        ctx.stats.start(ctx.depth)
+    value, action, expanded = max_value(state, ctx.depth, -INF, INF, ctx)
     return value, action, state, expanded
 
-def max_value(state: Connect4State, depth, alpha, beta):
+def _probe(state, depth, alpha, beta, table):
+    """
+    Look the state up in the transposition table.  Returns (value, action):
+    value is not None when a stored entry searched at least this deep
+    settles the node for the (alpha, beta) window; action is the stored
+    best move (usable for ordering) whenever the position is in the table.
+
+    Entries are keyed by the canonical (mirror-shared) key with their move
+    in the canonical orientation.
+    """
+    key, mirrored = state.canonical_key()
+    entry = table.probe(key)
+    if entry is None:
+        return None, None
+
+    _, stored_depth, value, flag, move = entry
+    if mirrored and move is not None:
+        move = mirror_move(move)
+    if stored_depth >= depth and (flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha)):
+        return value, move
+    return None, move
+
+def _store(state, depth, alpha, beta, table, value, action):
+    if value <= alpha:
+        flag = UPPER
+    elif value >= beta:
+        flag = LOWER
+    else:
+        flag = EXACT
+    key, mirrored = state.canonical_key()
+    if mirrored and action is not None:
+        action = mirror_move(action)
+    table.store(key, depth, value, flag, action)
+
+def max_value(state: Connect4State, depth, alpha, beta, ctx: SearchContext):
+    ctx.check()
+    table, orderer, stats = ctx.table, ctx.orderer, ctx.stats
+    if stats is not None:
+        stats.node(depth)
     if (state.is_terminal() or depth == 0):
-        return state.heuristic(), None, 1
-    
+        return evaluate(state, stats), None, 1
+
+    hash_move = None
+    if table is not None:
+        v, hash_move = _probe(state, depth, alpha, beta, table)
+        if v is not None:
+            state.value = v
+            return v, hash_move, 1
+        alpha0, beta0 = alpha, beta
+
+    # The root of a symmetric position only needs one of each mirrored pair
+    actions = state.distinct_actions() if state.parent is None else state.available_actions()
+    if orderer is not None:
+        actions = orderer.order(state, actions, depth, hash_move)
+
     rv = -INF
     best_action = None
     expanded = 0
 
-    for c in state.available_actions():
-        v2, _, ex = min_value(state.transition(c, alpha, beta), depth-1, alpha, beta)
+    for c in actions:
+        v2, _, ex = min_value(state.transition(c, alpha, beta), depth-1, alpha, beta, ctx)
         expanded += ex
         
         if rv < v2:
@@ -25,22 +84,49 @@ def max_value(state: Connect4State, depth, alpha, beta):
             alpha = max(alpha, rv)
 
         if (alpha >= beta):
-            state.value = rv
-            return rv, best_action, expanded
+            if stats is not None:
+                stats.cutoffs += 1
+            if orderer is not None:
+                orderer.cutoff(state, c, depth)
+            break
+
+    if table is not None:
+        _store(state, depth, alpha0, beta0, table, rv, best_action)
+    if orderer is not None:
+        orderer.best(state, best_action, depth)
 
     state.value = rv
+    if stats is not None:
+        stats.leave(state)
+    state.drop_children()
     return rv, best_action, expanded
 
-def min_value(state: Connect4State, depth, alpha, beta):
+def min_value(state: Connect4State, depth, alpha, beta, ctx: SearchContext):
+    ctx.check()
+    table, orderer, stats = ctx.table, ctx.orderer, ctx.stats
+    if stats is not None:
+        stats.node(depth)
     if (state.is_terminal() or depth == 0):
-        return state.heuristic(), None, 1
-    
+        return evaluate(state, stats), None, 1
+
+    hash_move = None
+    if table is not None:
+        v, hash_move = _probe(state, depth, alpha, beta, table)
+        if v is not None:
+            state.value = v
+            return v, hash_move, 1
+        alpha0, beta0 = alpha, beta
+
+    actions = state.available_actions()
+    if orderer is not None:
+        actions = orderer.order(state, actions, depth, hash_move)
+
     rv = INF
     best_action = None
     expanded = 0
 
-    for c in state.available_actions():
-        v2, _, ex = max_value(state.transition(c, alpha, beta), depth-1, alpha, beta)
+    for c in actions:
+        v2, _, ex = max_value(state.transition(c, alpha, beta), depth-1, alpha, beta, ctx)
         expanded += ex
 
         if rv > v2:
@@ -48,8 +134,19 @@ def min_value(state: Connect4State, depth, alpha, beta):
             beta = min(beta, rv)
 
         if (alpha >= beta):
-            state.value = rv
-            return rv, best_action, expanded
+            if stats is not None:
+                stats.cutoffs += 1
+            if orderer is not None:
+                orderer.cutoff(state, c, depth)
+            break
+
+    if table is not None:
+        _store(state, depth, alpha0, beta0, table, rv, best_action)
+    if orderer is not None:
+        orderer.best(state, best_action, depth)
 
     state.value = rv
-    return rv, best_action, expanded
\ No newline at end of file
+    if stats is not None:
+        stats.leave(state)
+    state.drop_children()
+    return rv, best_action, expanded
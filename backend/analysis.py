@@ -0,0 +1,131 @@
+"""
+Bulk position analysis over a process pool
+
+analyze_batch() searches many boards with the same settings, one board per
+worker process, and yields each result as soon as it finishes (so not in
+input order).  It needs nothing from the server:
+
+    from analysis import analyze_batch
+    for result in analyze_batch(boards, k=6, use_alpha_beta=True):
+        print(result['index'], result['column'], result['value'])
+
+or from the shell, with a JSON file holding a list of boards:
+
+    python3 analysis.py boards.json --k 6 --alpha-beta > results.ndjson
+
+Boards use the internal format (0 empty, 1 AI, -1 human, row 0 at the
+bottom) and are searched with the AI to move.  POST /api/analyze-batch
+streams the same results as NDJSON.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from bitboard import BitboardState
+from ordering import MoveOrderer
+from transposition import TranspositionTable
+from context import SearchContext
+import minimax
+import alpha_beta
+import expected_minimax
+import expected_alpha_beta
+import pvs
+import parallel
+
+ALGORITHMS = ('minimax', 'expectiminimax', 'pvs')
+
+# Boards in flight per worker, so a large batch is not all queued up front
+# and an abandoned stream leaves little work behind
+IN_FLIGHT_PER_WORKER = 2
+
+
+def analyze_position(index, board, k, algorithm='minimax', use_alpha_beta=True, state_cls=BitboardState,
+                     use_table=False, use_ordering=False):
+    """
+    Worker side: search one board without keeping the tree and return
+    {index, column, value, nodes, timeMs}.  column is None when the AI has
+    no move.
+    """
+    start = time.perf_counter()
+    ctx = SearchContext(k, state_cls, keep_tree=False)
+    if algorithm == 'pvs':
+        ctx.table = TranspositionTable() if use_table else None
+        ctx.orderer = MoveOrderer() if use_ordering else None
+        value, action, _, expanded = pvs.minimax(board, ctx)
+    elif algorithm == 'expectiminimax':
+        engine = expected_alpha_beta if use_alpha_beta else expected_minimax
+        value, action, _, expanded = engine.minimax(board, ctx)
+    elif use_alpha_beta:
+        ctx.table = TranspositionTable() if use_table else None
+        ctx.orderer = MoveOrderer() if use_ordering else None
+        value, action, _, expanded = alpha_beta.minimax(board, ctx)
+    else:
+        ctx.table = TranspositionTable() if use_table else None
+        value, action, _, expanded = minimax.minimax(board, ctx)
+    return {
+        'index': index,
+        'column': action,
+        'value': value,
+        'nodes': expanded,
+        'timeMs': round((time.perf_counter() - start) * 1000, 3),
+    }
+
+
+def analyze_batch(boards, k=4, algorithm='minimax', use_alpha_beta=True, state_cls=BitboardState,
+                  use_table=False, use_ordering=False, pool=None, workers=None):
+    """
+    Search every board and yield its analyze_position() result as it
+    finishes.  Runs on the shared pool of parallel.get_pool() unless a pool
+    is given; workers is the pool size, which bounds the boards in flight.
+    Closing the generator early cancels the boards that have not started.
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"unknown algorithm {algorithm!r}")
+    if pool is None:
+        pool = parallel.get_pool()
+        workers = parallel.WORKERS
+    max_running = IN_FLIGHT_PER_WORKER * (workers or parallel.WORKERS)
+
+    pending = enumerate(boards)
+    running = set()
+    try:
+        while True:
+            for index, board in pending:
+                running.add(pool.submit(analyze_position, index, board, k, algorithm, use_alpha_beta,
+                                        state_cls, use_table, use_ordering))
+                if len(running) >= max_running:
+                    break
+            if not running:
+                return
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        for future in running:
+            future.cancel()
+
+
+if __name__ == '__main__':
+    from concurrent.futures import ProcessPoolExecutor
+
+    parser = argparse.ArgumentParser(description="Analyze a JSON list of Connect4 boards, one NDJSON result per board")
+    parser.add_argument('boards', help="JSON file with a list of boards (0 empty, 1 AI, -1 human, row 0 at the bottom)")
+    parser.add_argument('--k', type=int, default=4, help="search depth")
+    parser.add_argument('--algorithm', choices=ALGORITHMS, default='minimax')
+    parser.add_argument('--alpha-beta', action='store_true', help="prune with alpha-beta")
+    parser.add_argument('--table', action='store_true', help="use a transposition table")
+    parser.add_argument('--ordering', action='store_true', help="use killer / history move ordering")
+    parser.add_argument('--workers', type=int, default=None, help="search processes (default: all cores)")
+    args = parser.parse_args()
+
+    with open(args.boards) as f:
+        boards = json.load(f)
+    workers = args.workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, mp_context=parallel.pool_context()) as pool:
+        for result in analyze_batch(boards, args.k, args.algorithm, args.alpha_beta, BitboardState,
+                                    args.table, args.ordering, pool, workers):
+            sys.stdout.write(json.dumps(result) + '\n')
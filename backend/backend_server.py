@@ -7,8 +7,9 @@ To run: python3 backend_server.py
 Then in another terminal: npm run dev
 """
 
+import json
 import time
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import sys
 import os
@@ -17,15 +18,66 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
 
 # Import backend modules (not modifying them)
-from state import Connect4State
+from state import Connect4State, ROWS, COLS
+from engines import ENGINES, search_name
 import minimax
 import alpha_beta
 import expected_minimax
 import expected_alpha_beta
+import iterative
+import pvs
+import stack_search
+import endgame
+import parallel
+import lazy_smp
+from transposition import TranspositionTable, POLICIES
+from ordering import MoveOrderer
+from tree_codec import node_player_type, encode_tree, encode_response
+from opening_book import load_book
+from result_cache import ResultCache, canonical_board_key, mirror_result
+from ponder import PonderRegistry
+from jobs import JobManager, QueueFull
+from stats import SearchStats
+from context import SearchContext
+from search_control import Deadline, SearchAborted
+from metrics import Metrics
+from analysis import analyze_batch
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for React frontend
 
+# Opening book (None when no book file has been generated)
+BOOK = load_book()
+
+# Finished searches shared across requests, keyed by the canonical board and
+# every request option that changes the result or its tree (see move_response)
+RESULTS = ResultCache(
+    max_entries=int(os.environ.get('C4_CACHE_ENTRIES', 1024)),
+    max_bytes=int(os.environ.get('C4_CACHE_BYTES', 64 * 1024 * 1024)),
+    ttl=float(os.environ.get('C4_CACHE_TTL', 600)),
+)
+
+# Background search of the human's replies between moves, one per game
+# ('gameId' request field)
+PONDERERS = PonderRegistry(max_games=int(os.environ.get('C4_PONDER_GAMES', 64)))
+
+# Latency histograms and search counters behind /api/metrics
+METRICS = Metrics()
+
+# Most boards one /api/analyze-batch request may carry
+BATCH_MAX = int(os.environ.get('C4_BATCH_MAX', 10000))
+
+# Largest 'ttSize' a request may ask for (lazySmp puts 16 bytes per slot
+# in shared memory)
+TT_SIZE_MAX = int(os.environ.get('C4_TT_SIZE_MAX', 1 << 22))
+
+# Part of a timed request's budget an endgame solve may use before the
+# normal search takes over
+SOLVE_SHARE = 0.5
+
+# Tree encodings selectable through the 'treeFormat' request field
+TREE_FORMATS = ('json', 'ndjson', 'binary')
+
 
 def board_to_internal_format(board):
     """
@@ -49,6 +101,12 @@ def board_to_internal_format(board):
     return internal_board
 
 
+def is_board(board):
+    """True when board is a ROWS x COLS list of rows, as the frontend sends it"""
+    return (isinstance(board, list) and len(board) == ROWS
+            and all(isinstance(row, list) and len(row) == COLS for row in board))
+
+
 def board_to_frontend_format(board):
     """
     Convert backend board format to frontend format
@@ -71,34 +129,13 @@ def board_to_frontend_format(board):
     return frontend_board
 
 
-def state_to_tree_json(state, is_expectiminimax=False):
+def tree_node_fields(state, is_expectiminimax=False):
     """
-    Convert backend state tree to frontend JSON format
-    Backend: State object with children array and action property
-    Frontend: { value, player, move, children: [...], probability? }
+    The per-node part of the tree JSON format, without children:
+    { value, player, move, expected?, probability? }
+    Shared by state_to_tree_json and the streaming NDJSON encoder.
     """
-    if state is None:
-        return None
-
-    # Determine player type based on state.player value
-    # state.player = 1 means MAX (AI), -1 means MIN (Human)
-    if is_expectiminimax:
-        # For expectiminimax, we need to track MAX/MIN/CHANCE nodes
-        # Chance nodes appear after MIN nodes (opponent's uncertain move)
-        if hasattr(state, 'is_chance') and state.is_chance:
-            player_type = 'CHANCE'
-        elif state.player == 1:
-            player_type = 'MAX'
-        else:
-            player_type = 'MIN'
-    else:
-        # For regular minimax, only MAX/MIN
-        player_type = 'MAX' if state.player == 1 else 'MIN'
-
-    # Check if terminal node (leaf)
-    is_leaf = len(state.children) == 0 or state.is_terminal()
-    if is_leaf:
-        player_type = 'LEAF'
+    player_type = node_player_type(state, is_expectiminimax)
 
     # Get the value - use heuristic if value not set
     node_value = state.value if state.value is not None else 0
@@ -107,7 +144,6 @@ def state_to_tree_json(state, is_expectiminimax=False):
         'value': node_value,
         'player': player_type,
         'move': state.action,  # Column index (0-6) or None for root
-        'children': []
     }
 
     # Add expected_value for expectiminimax from state.expected_value
@@ -122,6 +158,21 @@ def state_to_tree_json(state, is_expectiminimax=False):
         if len(state.children) > 0:
             node['probability'] = 1.0 / len(state.children)
 
+    return node
+
+
+def state_to_tree_json(state, is_expectiminimax=False):
+    """
+    Convert backend state tree to frontend JSON format
+    Backend: State object with children array and action property
+    Frontend: { value, player, move, children: [...], probability? }
+    """
+    if state is None:
+        return None
+
+    node = tree_node_fields(state, is_expectiminimax)
+    node['children'] = []
+
     # Recursively convert children
     for child in state.children:
         child_node = state_to_tree_json(child, is_expectiminimax)
@@ -131,6 +182,31 @@ def state_to_tree_json(state, is_expectiminimax=False):
     return node
 
 
+def iter_tree_ndjson(state, is_expectiminimax=False):
+    """
+    Walk the state tree iteratively (pre-order, explicit stack) and yield one
+    NDJSON line per node: tree_node_fields() plus 'id' and 'parent' (the id
+    of the parent node, None for the root).  Ids are assigned in the order
+    the lines are emitted, so a parent always arrives before its children.
+    """
+    if state is None:
+        return
+
+    next_id = 0
+    stack = [(state, None)]
+    while stack:
+        node_state, parent_id = stack.pop()
+        node = tree_node_fields(node_state, is_expectiminimax)
+        node['id'] = next_id
+        node['parent'] = parent_id
+        yield json.dumps(node) + '\n'
+
+        # Reversed so children are emitted in their original order
+        for child in reversed(node_state.children):
+            stack.append((child, next_id))
+        next_id += 1
+
+
 def check_game_over(state):
     """
     Check if game is over and who won
@@ -163,7 +239,14 @@ def make_move():
     AI moves: Run minimax/alpha-beta and return best move + tree
     Human moves: Only validate and check terminal state
     """
-    data = request.json
+    return move_response(request.json)
+
+
+def move_response(data, stop=None):
+    """
+    The /api/move logic for one request body.  stop (e.g. a CancelToken) is
+    handed to the search, which raises SearchAborted when it fires.
+    """
     
     # print("\n" + "="*60)
     # print("📥 RECEIVED REQUEST:")
@@ -178,21 +261,55 @@ def make_move():
     # Extract parameters
     frontend_board = data.get('board')
     player = data.get('player')  # 'ai' or 'human'
-    algorithm = data.get('algorithm', 'minimax')
+    algorithm = data.get('algorithm', 'minimax')  # 'minimax', 'expectiminimax' or 'pvs'
     use_alpha_beta = data.get('useAlphaBeta', False)
     k = data.get('k', 4)
     column = data.get('column', None)  # Only for human moves
     first_player = data.get('firstPlayer', 'human')
+    engine = data.get('engine', 'bitboard')
+    game_id = data.get('gameId', None)  # Pondering is kept per game
+
+    if engine not in ENGINES:
+        return jsonify({'error': 'Invalid engine'}), 400
+    state_cls = ENGINES[engine]
+    if game_id is not None and not isinstance(game_id, str):
+        return jsonify({'error': 'Invalid gameId'}), 400
+
+    use_table = data.get('useTranspositionTable', False)
+    tt_size = data.get('ttSize', 1 << 18)
+    tt_policy = data.get('ttPolicy', 'depth')
+    if use_table and (tt_policy not in POLICIES or not isinstance(tt_size, int)
+                      or not 0 < tt_size <= TT_SIZE_MAX):
+        return jsonify({'error': 'Invalid transposition table settings'}), 400
+    use_ordering = data.get('moveOrdering', False)
+    time_ms = data.get('timeMs', None)  # Search budget, switches to iterative deepening
+    use_parallel = data.get('parallel', False)  # Split the root moves over the process pool
+    use_lazy_smp = data.get('lazySmp', False)  # Whole alpha-beta search on every pool worker, one shared table
+    include_tree = data.get('includeTree', True)  # False runs the search without keeping the tree
+    tree_format = data.get('treeFormat', 'json')
+    use_book = data.get('useBook', True)
+    use_cache = data.get('useCache', True)
+    use_ponder = data.get('ponder', False)  # Search the human's replies while waiting
+    use_batch_eval = data.get('batchEval', False)  # Score plain minimax leaves with NumPy in one batch
+    use_stack_search = data.get('stackSearch', False)  # Alpha-beta by make/unmake on one board, no tree
+    endgame_threshold = data.get('endgameThreshold', 0)  # Solve exactly from this many empty cells, 0 = never
+    if tree_format not in TREE_FORMATS:
+        return jsonify({'error': 'Invalid treeFormat'}), 400
+    if time_ms is not None and (not isinstance(time_ms, (int, float)) or time_ms <= 0):
+        return jsonify({'error': 'Invalid timeMs'}), 400
+    # An exact solve has no depth limit, so it is only allowed where it is
+    # known to be cheap
+    if not isinstance(endgame_threshold, int) or not 0 <= endgame_threshold <= endgame.ENDGAME_THRESHOLD:
+        return jsonify({'error': 'Invalid endgameThreshold'}), 400
+    aspiration = data.get('aspirationWindow', pvs.ASPIRATION)  # PVS only
+    if not isinstance(aspiration, (int, float)) or aspiration <= 0:
+        return jsonify({'error': 'Invalid aspirationWindow'}), 400
 
     # Convert board to internal format
     internal_board = board_to_internal_format(frontend_board)
     
     # print(f"🔄 Converted internal board (first 2 rows): {internal_board[:2]}")
-    # print()    # Update K value in backend modules
-    minimax.K = k
-    alpha_beta.K = k
-    expected_minimax.K = k
-    expected_alpha_beta.K = k
+    # print()
 
     if player == 'human':
         # Human move - just validate and check terminal state
@@ -211,6 +328,11 @@ def make_move():
         new_state = state.transition(column)
         new_board = new_state.board
 
+        # Keep only the pondered search (if any) for the board the human chose
+        ponderer = PONDERERS.find(game_id)
+        if ponderer is not None:
+            ponderer.resolve(new_board)
+
         # Check if game is over using state's terminal_score
         game_over, winner, score = check_game_over(new_state)
 
@@ -246,30 +368,170 @@ def make_move():
         start_time = time.time()
         nodes_expanded = 0
         game_type = ""
+        iterations = None
+        has_tree = True  # False when the answer comes without a searched tree
+        stats = SearchStats()
+        engine_name = search_name(algorithm, use_alpha_beta)
+
+        # Transposition table only applies to the (non-chance) minimax searches
+        table = None
+        if use_table and not is_expectiminimax:
+            table = TranspositionTable(tt_size, tt_policy)
+        orderer = MoveOrderer() if use_ordering else None
+
+        # Near the end the game is solved outright instead of searched to k
+        solve_endgame = not is_expectiminimax and endgame.should_solve(internal_board, endgame_threshold)
+
+        # Every request option that changes the result, its tree or its
+        # stats: a stored result is only reused for the same options
+        options = (algorithm, bool(use_alpha_beta), k, solve_endgame, bool(use_lazy_smp),
+                   bool(use_table), tt_size if use_table else None, tt_policy if use_table else None,
+                   bool(use_ordering), bool(use_parallel), bool(use_stack_search),
+                   aspiration if algorithm == 'pvs' else None)
+
+        # The make/unmake search builds no tree, whatever includeTree says
+        stack_searched = (not is_expectiminimax and algorithm != 'pvs' and use_alpha_beta and use_stack_search
+                          and not use_lazy_smp and time_ms is None and not use_parallel
+                          and table is None and orderer is None)
+
+        # The ponderer runs plain alpha_beta, with or without table and
+        # ordering, so only that search can use its results
+        ponderable = (algorithm == 'minimax' and use_alpha_beta and not use_lazy_smp
+                      and not use_parallel and not use_stack_search)
+
+        # The book holds alpha-beta results of its own depth, so it answers
+        # minimax searches of exactly that depth (shallower ones would get
+        # a different value).  It has no tree to show.
+        book_entry = None
+        if use_book and BOOK is not None and not is_expectiminimax and k == BOOK.depth:
+            book_entry = BOOK.lookup(internal_board)
+
+        # Repeated positions are answered from the result cache.  Timed
+        # searches depend on machine load and only JSON trees are stored, so
+        # those requests always search.
+        cache_key = None
+        cache_mirrored = False
+        cached = None
+        pondered = None
+        can_reuse = time_ms is None and (not include_tree or tree_format == 'json')
+        # A search that builds no tree can only be answered without one
+        need_tree = include_tree and not solve_endgame and not stack_searched
+        if use_ponder and book_entry is None and can_reuse and ponderable and not solve_endgame:
+            ponderer = PONDERERS.find(game_id)
+            if ponderer is not None:
+                pondered = ponderer.take(internal_board, options, need_tree=need_tree)
+            cached = pondered
+        if use_cache and cached is None and book_entry is None and can_reuse:
+            canonical, cache_mirrored = canonical_board_key(internal_board)
+            cache_key = (canonical, *options)
+            cached = RESULTS.get(cache_key, need_tree=need_tree)
+            if cached is not None and cache_mirrored:
+                cached = mirror_result(cached)
+
+        # Everything the search needs travels in its own context, so
+        # concurrent requests share no engine state.  Only iterative
+        # deepening (alpha-beta and PVS) has a time budget.
+        deadline = None
+        if time_ms is not None and (use_alpha_beta or algorithm == 'pvs') and not is_expectiminimax:
+            deadline = Deadline(time_ms)
+        ctx = SearchContext(k, state_cls, include_tree, table, orderer, stop, deadline, stats,
+                            aspiration=aspiration)
+
+        # The exact solve gets the first SOLVE_SHARE of timeMs and its own
+        # stats.  When it runs out, the search below answers on the rest of
+        # the budget with fresh stats, as it would with the solver off, only
+        # with less time.
+        solved = False
+        if solve_endgame and book_entry is None and cached is None:
+            solve_stats = SearchStats()
+            solve_ctx = ctx.derive(stats=solve_stats)
+            if time_ms is not None:
+                solve_ctx = ctx.derive(stats=solve_stats, deadline=Deadline(time_ms * SOLVE_SHARE))
+            try:
+                value, action, root_state, nodes_expanded = endgame.solve(internal_board, solve_ctx)
+                solved = True
+                stats = solve_stats
+            except SearchAborted:
+                if stop is not None and stop.expired():
+                    raise
 
         # Select the appropriate algorithm
-        if is_expectiminimax:
+        if book_entry is not None:
+            value, _, action = book_entry
+            root_state = state_cls(internal_board, 1, None, None)
+            table = None
+            has_tree = False
+            game_type = "opening book"
+        elif cached is not None:
+            value, action = cached['value'], cached['action']
+            iterations = cached.get('iterations')
+            root_state = state_cls(internal_board, 1, None, None)
+            table = None
+            game_type = "pondered search" if pondered is not None else "cached search"
+        elif solved:
+            # The value is the exact final four difference rather than a
+            # heuristic score, and there is no tree
+            table = None
+            has_tree = False
+            engine_name = 'endgame'
+            game_type = "endgame solver"
+        elif algorithm == 'pvs':
+            # Always iterative: every iteration's score centres the next aspiration window
+            value, action, root_state, nodes_expanded, iterations = pvs.search(internal_board, ctx)
+            game_type = "principal variation search"
+        elif is_expectiminimax:
             if use_alpha_beta:
-                value, action, root_state, nodes_expanded = expected_alpha_beta.minimax(
-                    internal_board, k)
+                value, action, root_state, nodes_expanded = expected_alpha_beta.minimax(internal_board, ctx)
                 game_type = "expected minimax with alpha-beta"
             else:
-                value, action, root_state, nodes_expanded = expected_minimax.minimax(
-                    internal_board, k)
+                value, action, root_state, nodes_expanded = expected_minimax.minimax(internal_board, ctx)
                 game_type = "expected minimax"
         else:
-            if use_alpha_beta:
-                value, action, root_state, nodes_expanded = alpha_beta.minimax(
-                    internal_board, k)
+            if use_alpha_beta and use_lazy_smp:
+                # the shared table stands in for the request's table
+                value, action, root_state, nodes_expanded, iterations = lazy_smp.search(internal_board, ctx)
+                table = None
+                game_type = "lazy SMP minimax with alpha-beta"
+            elif use_alpha_beta and time_ms is not None:
+                value, action, root_state, nodes_expanded, iterations = iterative.iterative_deepening(
+                    internal_board, ctx)
+                game_type = "iterative deepening minimax with alpha-beta"
+            elif use_parallel:
+                # every worker keeps its own table and orderer
+                value, action, root_state, nodes_expanded = parallel.parallel_minimax(
+                    internal_board, ctx, use_alpha_beta)
+                table = None
+                game_type = "parallel minimax with alpha-beta" if use_alpha_beta else "parallel minimax"
+            elif stack_searched:
+                value, action, root_state, nodes_expanded = stack_search.minimax(internal_board, ctx)
+                has_tree = False
+                game_type = "minimax with alpha-beta (make/unmake)"
+            elif use_alpha_beta:
+                value, action, root_state, nodes_expanded = alpha_beta.minimax(internal_board, ctx)
                 game_type = "minimax with alpha-beta"
+            elif use_batch_eval:
+                import batch_eval  # NumPy is only needed for this option
+                value, action, root_state, nodes_expanded = batch_eval.minimax(internal_board, ctx)
+                game_type = "minimax with batched evaluation"
             else:
-                value, action, root_state, nodes_expanded = minimax.minimax(internal_board, k)
+                value, action, root_state, nodes_expanded = minimax.minimax(internal_board, ctx)
                 game_type = "minimax"
 
         end_time = time.time()
         time_taken = round((end_time - start_time) * 1000)
         print(f"record: {game_type}, {time_taken}, {nodes_expanded}")
 
+        searched = book_entry is None and cached is None
+        if book_entry is not None:
+            source = 'book'
+        elif pondered is not None:
+            source = 'ponder'
+        elif cached is not None:
+            source = 'cache'
+        else:
+            source = 'search'
+        METRICS.observe(engine_name, source, end_time - start_time, stats if searched else None)
+
         if action is None:
             return jsonify({'error': 'No valid moves available'}), 400
         
@@ -293,7 +555,16 @@ def make_move():
         # print("="*60 + "\n")
 
         # Convert state tree to JSON BEFORE calling transition to avoid modifying root_state
-        tree = state_to_tree_json(root_state, is_expectiminimax)
+        tree_text = None
+        if cached is not None:
+            tree_text = cached['tree'] if include_tree else None
+        elif include_tree and tree_format == 'json' and has_tree:
+            tree_text = json.dumps(state_to_tree_json(root_state, is_expectiminimax))
+
+        if cache_key is not None and cached is None:
+            result = {'value': value, 'action': action, 'expanded': nodes_expanded, 'tree': tree_text,
+                      'iterations': iterations}
+            RESULTS.put(cache_key, mirror_result(result) if cache_mirrored else result)
 
         # Apply the AI's chosen move to get the resulting board
         
@@ -301,23 +572,41 @@ def make_move():
         if action not in root_state.available_actions():
             return jsonify({'error': 'Invalid column'}), 400
         
-        # Apply the move
-        final_state = root_state.transition(action)
+        # Apply the move on a copy, so a streamed tree is still the searched one
+        final_state = root_state.copy().transition(action)
 
         new_board = final_state.board
 
         # Check if game is over using state's terminal_score
         game_over, winner, score = check_game_over(final_state)
 
+        # Once this board is solved every later one is too, and the solver
+        # never takes pondered results
+        if use_ponder and not game_over and ponderable and not solve_endgame:
+            PONDERERS.get(game_id).start(new_board, k, options, state_cls, include_tree,
+                                         lambda root: json.dumps(state_to_tree_json(root, False)),
+                                         (tt_size, tt_policy) if use_table else None, use_ordering)
+
         response = {
             'board': board_to_frontend_format(new_board),
             'column': action,
             'gameOver': game_over,
             'winner': winner,
             'score': score,
-            'tree': tree,
-            'value': value
+            'tree': None,
+            'value': value,
+            'bookHit': book_entry is not None,
+            'cacheHit': cached is not None and pondered is None,
+            'ponderHit': pondered is not None,
+            'solved': solved or (solve_endgame and cached is not None),
+            'timeMs': time_taken,
+            'stats': stats.to_dict() if searched else None
         }
+        if table is not None:
+            response['transposition'] = table.stats()
+        if iterations is not None:
+            response['depthReached'] = iterations[-1]['depth']
+            response['iterations'] = iterations
         
         # print(f"📤 SENDING AI RESPONSE:")
         # print(f"Column: {action}")
@@ -328,6 +617,30 @@ def make_move():
         # print(f"Board (first 2 rows): {response['board'][:2]}")
         # print(f"Tree nodes: {len(root_state.children)} children")
         # print("="*60 + "\n")
+
+        if include_tree and tree_format == 'ndjson':
+            # First line is the move result, then one line per tree node
+            if has_tree:
+                del response['tree']
+
+            def stream():
+                yield json.dumps(response) + '\n'
+                if has_tree:
+                    yield from iter_tree_ndjson(root_state, is_expectiminimax)
+
+            return Response(stream(), mimetype='application/x-ndjson')
+
+        if include_tree and tree_format == 'binary':
+            # Length-prefixed JSON move result followed by the columnar tree (see tree_codec)
+            del response['tree']
+            body = encode_response(response, encode_tree(root_state, is_expectiminimax) if has_tree else b'')
+            return Response(body, mimetype='application/octet-stream')
+
+        if tree_text is not None:
+            # Splice in the already serialized (possibly cached) tree
+            del response['tree']
+            body = json.dumps(response)[:-1] + ', "tree": ' + tree_text + '}'
+            return Response(body, mimetype='application/json')
         
         return jsonify(response)
 
@@ -335,6 +648,108 @@ def make_move():
         return jsonify({'error': 'Invalid player'}), 400
 
 
+def run_search_job(data, stop):
+    """JobManager runner: one AI move with a JSON tree, as (status, body)"""
+    with app.app_context():
+        response = app.make_response(move_response(dict(data, player='ai', treeFormat='json'), stop))
+        return response.status_code, json.loads(response.get_data())
+
+
+# Asynchronous searches behind /api/search
+JOBS = JobManager(
+    run_search_job,
+    workers=int(os.environ.get('C4_JOB_WORKERS', 2)),
+    max_queue=int(os.environ.get('C4_JOB_QUEUE', 16)),
+)
+
+
+@app.route('/api/search', methods=['POST'])
+def submit_search():
+    """
+    Queue an AI move search (same body as /api/move) and return its job id
+    right away.  Poll GET /api/search/<id> for the result.
+    """
+    try:
+        job = JOBS.submit(request.json)
+    except QueueFull:
+        return jsonify({'error': 'Search queue is full'}), 429
+    return jsonify({'id': job.id, 'status': job.status}), 202
+
+
+@app.route('/api/search/<job_id>', methods=['GET'])
+def search_status(job_id):
+    """Status of a search job, with the /api/move response once done"""
+    job = JOBS.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown search'}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/api/search/<job_id>', methods=['DELETE'])
+def cancel_search(job_id):
+    """Cancel a queued or running search job"""
+    job = JOBS.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown search'}), 404
+    return jsonify({'id': job.id, 'status': job.status})
+
+
+@app.route('/api/search', methods=['GET'])
+def search_stats():
+    """Search job queue counters"""
+    return jsonify(JOBS.stats())
+
+
+@app.route('/api/analyze-batch', methods=['POST'])
+def analyze_batch_endpoint():
+    """
+    Search a list of boards with the same settings on the process pool.
+    Body: {boards, algorithm, useAlphaBeta, k, engine, useTranspositionTable,
+    moveOrdering}.  Streams NDJSON, one {index, column, value, nodes, timeMs}
+    line per board in the order they finish, then a {done, positions,
+    timeMs} line.
+    """
+    data = request.json
+    boards = data.get('boards')
+    algorithm = data.get('algorithm', 'minimax')
+    use_alpha_beta = data.get('useAlphaBeta', False)
+    k = data.get('k', 4)
+    engine = data.get('engine', 'bitboard')
+    use_table = data.get('useTranspositionTable', False)
+    use_ordering = data.get('moveOrdering', False)
+
+    if not isinstance(boards, list) or not boards:
+        return jsonify({'error': 'boards must be a non-empty list'}), 400
+    if len(boards) > BATCH_MAX:
+        return jsonify({'error': f'At most {BATCH_MAX} boards per batch'}), 413
+    bad = next((i for i, board in enumerate(boards) if not is_board(board)), None)
+    if bad is not None:
+        return jsonify({'error': f'boards[{bad}] is not a {ROWS}x{COLS} board'}), 400
+    if algorithm not in ('minimax', 'expectiminimax', 'pvs'):
+        return jsonify({'error': 'Invalid algorithm'}), 400
+    if not isinstance(k, int) or k < 1:
+        return jsonify({'error': 'Invalid k'}), 400
+    if engine not in ENGINES:
+        return jsonify({'error': 'Invalid engine'}), 400
+
+    internal_boards = [board_to_internal_format(board) for board in boards]
+    engine_name = search_name(algorithm, use_alpha_beta)
+
+    def stream():
+        start = time.time()
+        for result in analyze_batch(internal_boards, k, algorithm, use_alpha_beta, ENGINES[engine],
+                                    use_table, use_ordering):
+            METRICS.observe(engine_name, 'batch', result['timeMs'] / 1000)
+            yield json.dumps(result) + '\n'
+        yield json.dumps({
+            'done': True,
+            'positions': len(internal_boards),
+            'timeMs': round((time.time() - start) * 1000),
+        }) + '\n'
+
+    return Response(stream(), mimetype='application/x-ndjson')
+
+
 @app.route('/api/game-status', methods=['POST'])
 def get_game_status():
     """
@@ -356,6 +771,32 @@ def get_game_status():
     })
 
 
+@app.route('/api/book', methods=['GET'])
+def book_stats():
+    """Opening book size and hit counters"""
+    if BOOK is None:
+        return jsonify({'loaded': False})
+    return jsonify({'loaded': True, **BOOK.stats()})
+
+
+@app.route('/api/cache', methods=['GET'])
+def cache_stats():
+    """Search result cache size and hit/miss counters"""
+    return jsonify(RESULTS.stats())
+
+
+@app.route('/api/ponder', methods=['GET'])
+def ponder_stats():
+    """Pondering counters"""
+    return jsonify(PONDERERS.stats())
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Search latency histograms and counters in Prometheus text format"""
+    return Response(METRICS.render(), mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -0,0 +1,203 @@
+"""
+Vectorized leaf evaluation with NumPy
+
+evaluate_boards() scores a stack of boards at once and returns exactly what
+Connect4State.heuristic() returns for each of them.  The 69 windows are
+precomputed as a (69, 4) array of flat cell indices, so counting pieces in
+every window of every board is one fancy-indexing gather plus a few sums.
+
+minimax() is a variant of minimax.minimax() built around it.  It recurses
+like minimax.minimax() until BATCH_PLIES plies remain, then expands that
+last subtree (at most 7 ** BATCH_PLIES frontier nodes), scores its frontier
+in one evaluate_boards() call and backs the values up, dropping the subtree
+unless the tree is kept.  It returns the same (value, action, root_state,
+expanded) as minimax.minimax().  It only pays off for states that score
+their own leaves from scratch (Connect4State, BitboardState): an
+IncrementalBitboardState leaf already costs O(1).
+"""
+
+import time
+
+import numpy as np
+
+from state import ROWS, COLS
+from bitboard import H
+from context import SearchContext
+from stats import evaluate
+
+INF = 1e18
+
+# Plies above the horizon whose frontier is scored in one batch
+BATCH_PLIES = 3
+
+
+def _window_index():
+    cells = []
+    for r in range(ROWS):
+        for c in range(COLS - 3):
+            cells.append([(r, c + i) for i in range(4)])
+    for r in range(ROWS - 3):
+        for c in range(COLS):
+            cells.append([(r + i, c) for i in range(4)])
+    for r in range(ROWS - 3):
+        for c in range(COLS - 3):
+            cells.append([(r + i, c + i) for i in range(4)])
+    for r in range(3, ROWS):
+        for c in range(COLS - 3):
+            cells.append([(r - i, c + i) for i in range(4)])
+    return np.array([[r * COLS + c for r, c in window] for window in cells], dtype=np.intp)
+
+
+# (69, 4) flat indices into a ROWS * COLS board, in the order of
+# Connect4State._all_windows()
+WINDOW_INDEX = _window_index()
+
+# Bit of every board cell in the bitboard layout, flattened row-major
+CELL_SHIFTS = np.array([c * H + r for r in range(ROWS) for c in range(COLS)], dtype=np.uint64)
+
+
+def evaluate_boards(boards):
+    """
+    Heuristic scores of a stacked (N, ROWS, COLS) array of 0/1/-1 boards
+    (row 0 at the bottom), as an int64 array of N scores identical to
+    Connect4State.heuristic().
+    """
+    flat = np.asarray(boards, dtype=np.int8).reshape(-1, ROWS * COLS)
+    windows = flat[:, WINDOW_INDEX]
+
+    ai = (windows == 1).sum(axis=2)
+    op = (windows == -1).sum(axis=2)
+    ai_only = op == 0
+    op_only = ai == 0
+
+    ai_four = (ai == 4).sum(axis=1)
+    ai_three = (ai_only & (ai == 3)).sum(axis=1)
+    ai_two = (ai_only & (ai == 2)).sum(axis=1)
+    ai_pos = (ai_only & (ai >= 1)).sum(axis=1)
+    op_four = (op == 4).sum(axis=1)
+    op_three = (op_only & (op == 3)).sum(axis=1)
+    op_two = (op_only & (op == 2)).sum(axis=1)
+    op_pos = (op_only & (op >= 1)).sum(axis=1)
+
+    # An AI three whose empty cell can be played right now
+    empty = flat == 0
+    supported = np.ones_like(empty)
+    supported[:, COLS:] = flat[:, :-COLS] != 0
+    playable = (empty & supported)[:, WINDOW_INDEX].any(axis=2)
+    threats = (ai_only & (ai == 3) & playable).sum(axis=1)
+
+    score = 1500 * (ai_four - op_four)
+    score += 1000 * threats
+    score += 300 * (np.maximum(0, ai_three - 1) - np.maximum(0, op_three - 1))
+    score += 100 * (ai_three - op_three)
+    score += 10 * (ai_two - op_two)
+    score += ai_pos - op_pos
+    return score.astype(np.int64)
+
+
+def states_to_boards(states):
+    """
+    Stack the boards of a list of states into an (N, ROWS, COLS) int8 array.
+    Bitboard states are unpacked from their masks without building lists.
+    """
+    if states and all(hasattr(s, 'ai') for s in states):
+        ai = np.array([s.ai for s in states], dtype=np.uint64)[:, None]
+        human = np.array([s.human for s in states], dtype=np.uint64)[:, None]
+        one = np.uint64(1)
+        boards = ((ai >> CELL_SHIFTS) & one).astype(np.int8) - ((human >> CELL_SHIFTS) & one).astype(np.int8)
+        return boards.reshape(-1, ROWS, COLS)
+    return np.array([s.board for s in states], dtype=np.int8).reshape(-1, ROWS, COLS)
+
+
+def minimax(board, ctx: SearchContext = None):
+    if ctx is None:
+        ctx = SearchContext()
+    state = ctx.root(board)
+    if ctx.stats is not None:
+        ctx.stats.start(ctx.depth)
+    value, action, expanded = _search(state, ctx.depth, ctx)
+    return value, action, state, expanded
+
+
+def _search(state, depth, ctx):
+    """
+    minimax.max_value() / min_value() in one, for the player to move.  The
+    last BATCH_PLIES plies are expanded and scored as a batch.
+    """
+    ctx.check()
+    stats = ctx.stats
+    if stats is not None:
+        stats.node(depth)
+    if (state.is_terminal() or depth == 0):
+        return evaluate(state, stats), None, 1
+
+    # The root of a symmetric position only needs one of each mirrored pair
+    actions = state.distinct_actions() if state.parent is None else state.available_actions()
+    if depth <= BATCH_PLIES:
+        leaves = []
+        for c in actions:
+            _expand(state.transition(c), depth-1, leaves, ctx)
+        _score(leaves, stats)
+        value, action = _back_up(state, stats)
+        return value, action, len(leaves)
+
+    rv = -INF if state.player == 1 else INF
+    best_action = None
+    expanded = 0
+    for c in actions:
+        v, _, ex = _search(state.transition(c), depth-1, ctx)
+        expanded += ex
+        if (state.player == 1 and rv < v) or (state.player == -1 and rv > v):
+            rv, best_action = v, c
+
+    state.value = rv
+    if stats is not None:
+        stats.leave(state)
+    state.drop_children()
+    return rv, best_action, expanded
+
+
+def _score(leaves, stats):
+    """Set the value of every leaf with one evaluate_boards() call"""
+    start = time.perf_counter()
+    scores = evaluate_boards(states_to_boards(leaves))
+    if stats is not None:
+        stats.heuristic_time += time.perf_counter() - start
+        stats.heuristic_calls += len(leaves)
+    for leaf, score in zip(leaves, scores.tolist()):
+        leaf.value = score
+
+
+def _expand(state, depth, leaves, ctx):
+    """
+    Build the tree under state down to depth, appending every frontier node
+    (depth 0 or terminal) to leaves.
+    """
+    ctx.check()
+    if ctx.stats is not None:
+        ctx.stats.node(depth)
+    if (state.is_terminal() or depth == 0):
+        leaves.append(state)
+        return
+
+    for c in state.available_actions():
+        _expand(state.transition(c), depth-1, leaves, ctx)
+
+
+def _back_up(state, stats):
+    # A non-terminal state always has a move, so only frontier nodes are childless
+    if not state.children:
+        return state.value, None
+
+    rv = -INF if state.player == 1 else INF
+    best_action = None
+    for child in state.children:
+        v, _ = _back_up(child, stats)
+        if (state.player == 1 and rv < v) or (state.player == -1 and rv > v):
+            rv, best_action = v, child.action
+
+    state.value = rv
+    if stats is not None:
+        stats.leave(state)
+    state.drop_children()
+    return rv, best_action
@@ -0,0 +1,22 @@
+"""
+Benchmark suite for the search algorithms
+
+Runs minimax, alpha_beta, expected_minimax, expected_alpha_beta, pvs and
+stack_search at a range of depths over a fixed corpus of opening, midgame
+and near-full positions, recording wall time, nodes expanded, nodes/sec and
+peak memory.
+Results are written as JSON and compared against a stored baseline.
+
+From the backend directory:
+
+    python3 -m benchmark                      # run, compare with baseline.json
+    python3 -m benchmark --out results.json   # also keep the results
+    python3 -m benchmark --save-baseline      # make this run the new baseline
+
+The exit status is 1 when any case regressed past its threshold, or an
+algorithm in runner.SPEEDUPS was not faster than the one it prunes.
+"""
+
+from benchmark.positions import POSITIONS, board_from_moves, load_positions
+from benchmark.runner import (ALGORITHMS, DEFAULT_ALGORITHMS, DEFAULT_DEPTHS, DEFAULT_THRESHOLDS, run, compare,
+                              check_speedups, save, load)
@@ -0,0 +1,66 @@
+import argparse
+import os
+import sys
+
+from benchmark.runner import (ALGORITHMS, DEFAULT_ALGORITHMS, DEFAULT_THRESHOLDS, ENGINES,
+                              MIN_TIMED_REPEAT, run, compare, check_speedups, save, load)
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m benchmark', description="Benchmark the Connect4 search algorithms")
+    parser.add_argument('--algorithms', nargs='+', choices=list(ALGORITHMS), default=list(DEFAULT_ALGORITHMS))
+    parser.add_argument('--k', nargs='+', type=int, default=None,
+                        help="search depths to run (default: each algorithm's own, see DEFAULT_DEPTHS)")
+    parser.add_argument('--phases', nargs='+', choices=['opening', 'midgame', 'near-full'], default=None)
+    parser.add_argument('--engine', choices=list(ENGINES), default='bitboard')
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per case (the median counts)")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc peak memory run")
+    parser.add_argument('--out', help="write the results JSON here")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help="store the results as the baseline")
+    parser.add_argument('--time-threshold', type=float, default=DEFAULT_THRESHOLDS['timeMs'],
+                        help="allowed relative slowdown (default: %(default)s)")
+    parser.add_argument('--memory-threshold', type=float, default=DEFAULT_THRESHOLDS['peakMemoryKb'],
+                        help="allowed relative peak memory growth (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    results = run(args.algorithms, args.k, args.phases, args.engine, args.repeat,
+                  not args.no_memory, log=print)
+
+    slower = check_speedups(results)
+    for s in slower:
+        print(f"NOT FASTER {s['algorithm']} k={s['k']}: {s['timeMs']} ms against "
+              f"{s['than']} {s['thanTimeMs']} ms")
+
+    if args.out:
+        save(results, args.out)
+    if args.save_baseline:
+        save(results, args.baseline)
+        print(f"saved baseline to {args.baseline}")
+        return 1 if slower else 0
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}")
+        return 1 if slower else 0
+
+    baseline = load(args.baseline)
+    if baseline['meta'].get('engine') != results['meta']['engine']:
+        print(f"warning: baseline was run with the {baseline['meta'].get('engine')} engine")
+
+    if min(args.repeat, baseline['meta'].get('repeat', 1)) < MIN_TIMED_REPEAT:
+        print(f"timings not compared: fewer than {MIN_TIMED_REPEAT} runs per case")
+
+    thresholds = {'timeMs': args.time_threshold, 'nodes': DEFAULT_THRESHOLDS['nodes'],
+                  'peakMemoryKb': args.memory_threshold}
+    regressions = compare(results, baseline, thresholds)
+    for r in regressions:
+        ratio = f" (x{r['ratio']})" if r['ratio'] is not None else ''
+        print(f"REGRESSION {r['position']} {r['algorithm']} k={r['k']} {r['metric']}: "
+              f"{r['baseline']} -> {r['current']}{ratio}")
+    print(f"{len(regressions)} regressions against {args.baseline}")
+    return 1 if regressions or slower else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
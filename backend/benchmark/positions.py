@@ -0,0 +1,44 @@
+"""
+Fixed benchmark corpus.  Every position is a column sequence played from
+the empty board, alternating players, and always ends with the AI (MAX)
+to move, so each one is a board the server could be asked to search.
+"""
+
+from state import ROWS, COLS
+
+# name -> (phase, moves); the first move of the sequence belongs to the
+# human when it has odd length and to the AI when it has even length
+POSITIONS = {
+    'empty':        ('opening', ''),
+    'centre-reply': ('opening', '3'),
+    'wide-open':    ('opening', '3324'),
+    'edge-start':   ('opening', '06152'),
+    'mid-centre':   ('midgame', '3332244152'),
+    'mid-stacked':  ('midgame', '33333322442'),
+    'mid-split':    ('midgame', '0123456654321'),
+    'late-left':    ('near-full', '000000111111222222333'),
+    'late-spread':  ('near-full', '3333332222224444441111115'),
+    'late-tight':   ('near-full', '00000011111122222233333344444455'),
+}
+
+
+def board_from_moves(moves):
+    """Play the column sequence from the empty board, ending with the AI to move"""
+    board = [[0] * COLS for _ in range(ROWS)]
+    heights = [0] * COLS
+    player = 1 if len(moves) % 2 == 0 else -1
+    for ch in moves:
+        col = int(ch)
+        if heights[col] == ROWS:
+            raise ValueError(f"column {col} is full in {moves!r}")
+        board[heights[col]][col] = player
+        heights[col] += 1
+        player = -player
+    return board
+
+
+def load_positions(phases=None):
+    """[(name, phase, board)] for the corpus, optionally only some phases"""
+    return [(name, phase, board_from_moves(moves))
+            for name, (phase, moves) in POSITIONS.items()
+            if phases is None or phase in phases]
@@ -0,0 +1,211 @@
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+
+from engines import ENGINES, ALGORITHMS
+from benchmark.positions import load_positions
+
+# The algorithms a plain run (and the stored baseline) covers
+DEFAULT_ALGORITHMS = ('minimax', 'alpha_beta', 'expected_minimax', 'expected_alpha_beta', 'pvs', 'stack_search')
+
+# Depths per algorithm, deep enough that the opening and midgame cases
+# take tens of milliseconds, so a slowdown stands out from timer noise
+DEFAULT_DEPTHS = {
+    'minimax': (4, 5),
+    'alpha_beta': (5, 6),
+    'alpha_beta_tt': (5, 6),
+    'alpha_beta_eg': (5, 6),
+    'stack_search': (5, 6),
+    'pvs': (6, 7),
+    'pvs_tt': (6, 7),
+    'expected_minimax': (4, 5),
+    'expected_alpha_beta': (4, 5),
+}
+
+# Allowed slowdown / growth relative to the baseline before a case counts
+# as a regression.  Node counts are deterministic, so any increase is one.
+DEFAULT_THRESHOLDS = {
+    'timeMs': 0.25,
+    'nodes': 0.0,
+    'peakMemoryKb': 0.25,
+}
+
+# Differences this small are noise, whatever the ratio.  A timing must
+# also differ by more than the spread (interquartile range) of the runs on
+# either side, the noise actually measured for that case.
+MIN_TIME_DELTA_MS = 1.0
+MIN_MEMORY_DELTA_KB = 64.0
+
+# Timings from fewer runs than this are too noisy to compare at all
+MIN_TIMED_REPEAT = 3
+
+# Search results that must match the baseline exactly
+RESULT_FIELDS = ('value', 'move')
+
+# (algorithm, slower algorithm, k): pruning only pays when the first one
+# also beats the second in wall time at depth k, not just in nodes
+SPEEDUPS = (
+    ('expected_alpha_beta', 'expected_minimax', 5),
+)
+
+
+def run_case(search, board, k, state_cls, repeat=5, measure_memory=True):
+    """
+    Time search(board, k, state_cls) as the median of `repeat` runs, with
+    the spread (interquartile range) of those runs, then (optionally) run
+    it once more under tracemalloc for the peak memory.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value, action, _, expanded = search(board, k, state_cls)
+        times.append(time.perf_counter() - start)
+    median = statistics.median(times)
+    # One slow outlier run says little about the noise of the median
+    spread = 0.0
+    if len(times) > 1:
+        q1, _, q3 = statistics.quantiles(times, n=4, method='inclusive')
+        spread = q3 - q1
+
+    peak_kb = None
+    if measure_memory:
+        tracemalloc.start()
+        search(board, k, state_cls)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_kb = round(peak / 1024, 1)
+
+    return {
+        'value': value,
+        'move': action,
+        'timeMs': round(median * 1000, 3),
+        'timeSpreadMs': round(spread * 1000, 3),
+        'nodes': expanded,
+        'nodesPerSec': round(expanded / median) if median > 0 else None,
+        'peakMemoryKb': peak_kb,
+    }
+
+
+def run(algorithms=None, depths=None, phases=None, engine='bitboard', repeat=5,
+        measure_memory=True, log=None):
+    """
+    Run every algorithm at every depth on every corpus position and return
+    the results document: {meta, results: [case, ...]}.  depths applies to
+    every algorithm; by default each one runs at its DEFAULT_DEPTHS.
+    """
+    algorithms = algorithms or list(DEFAULT_ALGORITHMS)
+    state_cls = ENGINES[engine]
+    depths = {algorithm: tuple(depths) if depths is not None else DEFAULT_DEPTHS[algorithm]
+              for algorithm in algorithms}
+
+    results = []
+    for name, phase, board in load_positions(phases):
+        for algorithm in algorithms:
+            for k in depths[algorithm]:
+                case = {'position': name, 'phase': phase, 'algorithm': algorithm, 'k': k}
+                case.update(run_case(ALGORITHMS[algorithm], board, k, state_cls, repeat, measure_memory))
+                results.append(case)
+                if log is not None:
+                    log(f"{name:13} {algorithm:20} k={k:<2} {case['timeMs']:10.1f} ms "
+                        f"{case['nodes']:9} nodes {case['nodesPerSec'] or 0:9} n/s")
+
+    meta = {
+        'engine': engine,
+        'depths': {algorithm: list(ks) for algorithm, ks in depths.items()},
+        'repeat': repeat,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'createdAt': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    return {'meta': meta, 'results': results}
+
+
+def _case_key(case):
+    return case['position'], case['algorithm'], case['k']
+
+
+def compare(current, baseline, thresholds=DEFAULT_THRESHOLDS):
+    """
+    Compare two results documents case by case.  Returns a list of
+    regressions {position, algorithm, k, metric, baseline, current, ratio};
+    cases missing from either side are ignored.  A changed value or move
+    is always a regression (its ratio is None): the search result itself
+    changed.  Timings are only compared when both sides ran every case at
+    least MIN_TIMED_REPEAT times.
+    """
+    base = {_case_key(case): case for case in baseline['results']}
+    timed = min(current['meta'].get('repeat', 1), baseline['meta'].get('repeat', 1)) >= MIN_TIMED_REPEAT
+    regressions = []
+    for case in current['results']:
+        old = base.get(_case_key(case))
+        if old is None:
+            continue
+        for metric in RESULT_FIELDS:
+            if metric in old and old[metric] != case.get(metric):
+                regressions.append({
+                    'position': case['position'],
+                    'algorithm': case['algorithm'],
+                    'k': case['k'],
+                    'metric': metric,
+                    'baseline': old[metric],
+                    'current': case.get(metric),
+                    'ratio': None,
+                })
+        for metric, threshold in thresholds.items():
+            before, after = old.get(metric), case.get(metric)
+            if before is None or after is None:
+                continue
+            if metric == 'timeMs' and (not timed or after - before <= max(
+                    MIN_TIME_DELTA_MS, case.get('timeSpreadMs', 0), old.get('timeSpreadMs', 0))):
+                continue
+            if metric == 'peakMemoryKb' and after - before < MIN_MEMORY_DELTA_KB:
+                continue
+            ratio = after / before if before else (1.0 if after == before else float('inf'))
+            if ratio > 1 + threshold:
+                regressions.append({
+                    'position': case['position'],
+                    'algorithm': case['algorithm'],
+                    'k': case['k'],
+                    'metric': metric,
+                    'baseline': before,
+                    'current': after,
+                    'ratio': round(ratio, 3),
+                })
+    return regressions
+
+
+def check_speedups(document, speedups=SPEEDUPS):
+    """
+    The SPEEDUPS that the results document does not bear out, as
+    {algorithm, than, k, timeMs, thanTimeMs} with the median times summed
+    over the positions both algorithms ran at depth k.  Pairs the run did
+    not cover, and runs of fewer than MIN_TIMED_REPEAT repeats, are not
+    checked.
+    """
+    if document['meta'].get('repeat', 1) < MIN_TIMED_REPEAT:
+        return []
+    times = {(case['position'], case['algorithm'], case['k']): case['timeMs'] for case in document['results']}
+    failures = []
+    for algorithm, than, k in speedups:
+        positions = [p for p, a, d in times if a == algorithm and d == k and (p, than, k) in times]
+        if not positions:
+            continue
+        fast = sum(times[p, algorithm, k] for p in positions)
+        slow = sum(times[p, than, k] for p in positions)
+        if fast >= slow:
+            failures.append({'algorithm': algorithm, 'than': than, 'k': k,
+                             'timeMs': round(fast, 3), 'thanTimeMs': round(slow, 3)})
+    return failures
+
+
+def save(document, path):
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=1)
+        f.write('\n')
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,384 @@
+from state import Connect4State, ROWS, COLS, ZOBRIST, SIDE_KEY, mirror_move
+
+# Every column takes ROWS + 1 bits (bit c * H + r is row r of column c, row 0
+# at the bottom).  The spare bit on top of each column is never set, so a
+# shift by one never carries a piece into the next column.
+H = ROWS + 1
+
+BOTTOM_MASK = sum(1 << (c * H) for c in range(COLS))
+BOARD_MASK = BOTTOM_MASK * ((1 << ROWS) - 1)
+TOP_MASK = BOTTOM_MASK << (ROWS - 1)
+
+
+def cell_bit(r, c):
+    return 1 << (c * H + r)
+
+
+def _window_mask(r, c, dr, dc):
+    mask = 0
+    for i in range(4):
+        mask |= cell_bit(r + i*dr, c + i*dc)
+    return mask
+
+
+def _all_window_masks():
+    windows = []
+
+    # horizontal
+    for r in range(ROWS):
+        for c in range(COLS - 3):
+            windows.append(_window_mask(r, c, 0, 1))
+
+    # vertical
+    for r in range(ROWS - 3):
+        for c in range(COLS):
+            windows.append(_window_mask(r, c, 1, 0))
+
+    # diag up-right
+    for r in range(ROWS - 3):
+        for c in range(COLS - 3):
+            windows.append(_window_mask(r, c, 1, 1))
+
+    # diag down-right
+    for r in range(3, ROWS):
+        for c in range(COLS - 3):
+            windows.append(_window_mask(r, c, -1, 1))
+
+    return windows
+
+
+WINDOWS = _all_window_masks()
+
+
+def board_to_masks(board):
+    """
+    Convert a ROWS x COLS list board (0/1/-1) into (ai_mask, human_mask, heights)
+    """
+    ai = human = 0
+    heights = [0] * COLS
+    for r in range(ROWS):
+        for c in range(COLS):
+            if board[r][c] == 1:
+                ai |= cell_bit(r, c)
+            elif board[r][c] == -1:
+                human |= cell_bit(r, c)
+            else:
+                continue
+            heights[c] = r + 1
+    return ai, human, heights
+
+
+def masks_to_board(ai, human):
+    board = [[0] * COLS for _ in range(ROWS)]
+    for r in range(ROWS):
+        for c in range(COLS):
+            bit = cell_bit(r, c)
+            if ai & bit:
+                board[r][c] = 1
+            elif human & bit:
+                board[r][c] = -1
+    return board
+
+
+def masks_hash(ai, human, player, mirror=False):
+    """
+    Same Zobrist key as state.board_hash() for the equivalent list board
+    (state.mirror_hash() with mirror set)
+    """
+    key = SIDE_KEY if player == -1 else 0
+    for r in range(ROWS):
+        for c in range(COLS):
+            bit = cell_bit(r, c)
+            col = mirror_move(c) if mirror else c
+            if ai & bit:
+                key ^= ZOBRIST[r][col][1]
+            elif human & bit:
+                key ^= ZOBRIST[r][col][-1]
+    return key
+
+
+def count_windows(ai, human):
+    """
+    Count windows for both sides in one pass over WINDOWS.
+    Returns (ai_four, ai_three, ai_two, ai_pos,
+             op_four, op_three, op_two, op_pos, ai_playable_threes)
+    with the same meaning as Connect4State.count_windows() and
+    Connect4State._test_all_windows_for_complete().
+    """
+    occupied = ai | human
+    playable = ~occupied & ((occupied << 1) | BOTTOM_MASK)
+
+    ai_four = ai_three = ai_two = ai_pos = 0
+    op_four = op_three = op_two = op_pos = 0
+    threats = 0
+
+    for w in WINDOWS:
+        a = w & ai
+        o = w & human
+        if a and o:
+            continue
+        if a:
+            cnt = a.bit_count()
+            if cnt == 4:
+                ai_four += 1
+            elif cnt == 3:
+                ai_three += 1
+                if w & playable:
+                    threats += 1
+            elif cnt == 2:
+                ai_two += 1
+            ai_pos += 1
+        elif o:
+            cnt = o.bit_count()
+            if cnt == 4:
+                op_four += 1
+            elif cnt == 3:
+                op_three += 1
+            elif cnt == 2:
+                op_two += 1
+            op_pos += 1
+
+    return (ai_four, ai_three, ai_two, ai_pos,
+            op_four, op_three, op_two, op_pos, threats)
+
+
+def score_counts(counts):
+    """
+    Combine the tuple returned by count_windows() exactly like
+    Connect4State.heuristic() does.
+    """
+    ai_four, ai_three, ai_two, ai_pos, op_four, op_three, op_two, op_pos, threats = counts
+
+    score = 0
+
+    score += 1500 * ai_four
+    score -= 1500 * op_four
+
+    # _test_about_to_complete() only ever fires for the AI's threes
+    score += 1000 * threats
+
+    score += 300 * max(0, ai_three-1)
+    score -= 300 * max(0, op_three-1)
+
+    score += 100 * ai_three
+    score -= 100 * op_three
+
+    score += 10 * ai_two
+    score -= 10 * op_two
+
+    score += 1 * ai_pos
+    score -= 1 * op_pos
+
+    # the centre column term of Connect4State.heuristic() cancels itself out
+
+    return score
+
+
+class BitboardState(Connect4State):
+    """
+    Drop-in replacement for Connect4State that keeps the position as two
+    integer masks (AI / human pieces) plus column heights instead of a
+    ROWS x COLS list, so transition() never copies the board.
+    """
+
+    def __init__(self, board=None, player=1, action=None, parent=None, alpha = None, beta = None, key = None, masks=None, mirror_key=None):
+        if masks is not None:
+            self.ai, self.human, self.heights = masks
+        elif board is None:
+            self.ai, self.human, self.heights = 0, 0, [0] * COLS
+        else:
+            self.ai, self.human, self.heights = board_to_masks(board)
+
+        self.player = player
+        self.key = key if key is not None else masks_hash(self.ai, self.human, player)
+        self.mirror_key = mirror_key if mirror_key is not None else masks_hash(self.ai, self.human, player, True)
+        self.action = action
+        self.parent = parent
+
+        self.alpha = alpha
+        self.beta = beta
+        self.value = None
+        self.expected_value = None
+        self.children = []
+        self.keep_tree = True
+
+    @property
+    def board(self):
+        return masks_to_board(self.ai, self.human)
+
+    def copy(self):
+        return type(self)(player=self.player, action=self.action, parent=self.parent, key=self.key,
+                          masks=(self.ai, self.human, self.heights.copy()), mirror_key=self.mirror_key)
+
+    def available_actions(self):
+        return [c for c in range(COLS) if self.heights[c] < ROWS]
+
+    def _next_open_row(self, col):
+        if self.heights[col] >= ROWS:
+            raise IndexError("Column full")
+        return self.heights[col]
+
+    def _child_masks(self, action):
+        r = self._next_open_row(action)
+        bit = cell_bit(r, action)
+        heights = self.heights.copy()
+        heights[action] = r + 1
+        if self.player == 1:
+            return self.ai | bit, self.human, heights
+        return self.ai, self.human | bit, heights
+
+    def transition(self, action, alpha = None, beta = None):
+        r = self.heights[action]
+        child = type(self)(None, -self.player, action, self, alpha, beta, self._child_key(r, action),
+                           masks=self._child_masks(action), mirror_key=self._child_mirror_key(r, action))
+        self._adopt(child)
+        return child
+
+    def neighbors(self):
+        return [type(self)(None, -self.player, c, self, key=self._child_key(self.heights[c], c), masks=self._child_masks(c),
+                           mirror_key=self._child_mirror_key(self.heights[c], c))
+                for c in self.available_actions()]
+
+    def is_terminal(self):
+        return (self.ai | self.human) & TOP_MASK == TOP_MASK
+
+    def terminal_score(self):
+        counts = count_windows(self.ai, self.human)
+        return {1: counts[0], -1: counts[4]}
+
+    def heuristic(self):
+        score = score_counts(count_windows(self.ai, self.human))
+        self.value = score
+        return score
+
+
+def _cell_windows():
+    cells = {}
+    for w in WINDOWS:
+        for r in range(ROWS):
+            for c in range(COLS):
+                if w & cell_bit(r, c):
+                    cells.setdefault((r, c), []).append(w)
+    return cells
+
+
+def _above_windows(cells):
+    """
+    For every cell, the windows through the cell above it that do not
+    contain the cell itself.  Dropping a piece only changes whether their
+    empty cell is playable.
+    """
+    above = {}
+    for (r, c), windows in cells.items():
+        if r + 1 < ROWS:
+            above[cell_bit(r, c)] = [w for w in cells[(r + 1, c)] if w not in windows]
+        else:
+            above[cell_bit(r, c)] = []
+    return above
+
+
+_CELLS = _cell_windows()
+CELL_WINDOWS = {cell_bit(r, c): windows for (r, c), windows in _CELLS.items()}
+ABOVE_WINDOWS = _above_windows(_CELLS)
+
+
+def _add_window(tally, w, ai, human, playable, sign):
+    a = w & ai
+    o = w & human
+    if a and o:
+        return
+    if a:
+        cnt = a.bit_count()
+        if cnt == 4:
+            tally[0] += sign
+        elif cnt == 3:
+            tally[1] += sign
+            if w & playable:
+                tally[8] += sign
+        elif cnt == 2:
+            tally[2] += sign
+        tally[3] += sign
+    elif o:
+        cnt = o.bit_count()
+        if cnt == 4:
+            tally[4] += sign
+        elif cnt == 3:
+            tally[5] += sign
+        elif cnt == 2:
+            tally[6] += sign
+        tally[7] += sign
+
+
+def update_tally(tally, ai, human, child_ai, child_human):
+    """
+    Turn the count_windows() tally of (ai, human) in place into that of
+    (child_ai, child_human), the same position with one more piece.
+    """
+    occupied = ai | human
+    child_occupied = child_ai | child_human
+    bit = child_occupied ^ occupied
+    playable = ~occupied & ((occupied << 1) | BOTTOM_MASK)
+    child_playable = ~child_occupied & ((child_occupied << 1) | BOTTOM_MASK)
+
+    for w in CELL_WINDOWS[bit]:
+        _add_window(tally, w, ai, human, playable, -1)
+        _add_window(tally, w, child_ai, child_human, child_playable, 1)
+
+    # the cell above just became playable, completing any AI three
+    # that was only waiting on it
+    for w in ABOVE_WINDOWS[bit]:
+        if not w & child_human and (w & child_ai).bit_count() == 3:
+            tally[8] += 1
+
+
+class IncrementalBitboardState(BitboardState):
+    """
+    BitboardState that carries the running count_windows() tally of its
+    position.  The per-window piece counts are the popcounts of each window
+    mask against the two piece masks, so transition() only has to re-tally
+    the (at most 16) windows through the dropped cell and re-check the
+    playable-three bonus of the windows through the cell above it, and
+    heuristic() becomes O(1).
+    """
+
+    def __init__(self, board=None, player=1, action=None, parent=None, alpha = None, beta = None, key = None, masks=None, tally=None, mirror_key=None):
+        super().__init__(board, player, action, parent, alpha, beta, key, masks, mirror_key)
+        if tally is None:
+            tally = list(count_windows(self.ai, self.human))
+        self.tally = tally
+
+    def copy(self):
+        return type(self)(player=self.player, action=self.action, parent=self.parent, key=self.key,
+                          masks=(self.ai, self.human, self.heights.copy()), tally=self.tally.copy(),
+                          mirror_key=self.mirror_key)
+
+    def _child_tally(self, masks):
+        ai, human, _ = masks
+        tally = self.tally.copy()
+        update_tally(tally, self.ai, self.human, ai, human)
+        return tally
+
+    def transition(self, action, alpha = None, beta = None):
+        masks = self._child_masks(action)
+        r = self.heights[action]
+        child = type(self)(None, -self.player, action, self, alpha, beta, self._child_key(r, action),
+                           masks=masks, tally=self._child_tally(masks), mirror_key=self._child_mirror_key(r, action))
+        self._adopt(child)
+        return child
+
+    def neighbors(self):
+        children = []
+        for c in self.available_actions():
+            masks = self._child_masks(c)
+            children.append(type(self)(None, -self.player, c, self, key=self._child_key(self.heights[c], c),
+                                       masks=masks, tally=self._child_tally(masks),
+                                       mirror_key=self._child_mirror_key(self.heights[c], c)))
+        return children
+
+    def terminal_score(self):
+        return {1: self.tally[0], -1: self.tally[4]}
+
+    def heuristic(self):
+        score = score_counts(self.tally)
+        self.value = score
+        return score
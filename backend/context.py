@@ -0,0 +1,70 @@
+from state import Connect4State
+from search_control import AnyOf, SearchAborted
+
+DEFAULT_DEPTH = 10
+
+
+class SearchContext:
+    """
+    Everything one search needs besides the position, passed explicitly to
+    every engine so concurrent searches share nothing:
+
+        depth       root search depth (k)
+        state_cls   position representation (Connect4State or a bitboard)
+        keep_tree   keep the searched tree for the response
+        table       TranspositionTable, or None
+        orderer     MoveOrderer, or None
+        stop        external stop condition (e.g. a CancelToken), or None
+        deadline    Deadline of a timed search, or None
+        stats       SearchStats to fill in, or None
+        options     engine specific settings, read with option()
+
+    The engines call check() at every node; it raises SearchAborted once
+    stop or deadline fires.
+    """
+
+    def __init__(self, depth=DEFAULT_DEPTH, state_cls=Connect4State, keep_tree=True, table=None, orderer=None,
+                 stop=None, deadline=None, stats=None, **options):
+        self.depth = depth
+        self.state_cls = state_cls
+        self.keep_tree = keep_tree
+        self.table = table
+        self.orderer = orderer
+        self.stop = stop
+        self.deadline = deadline
+        self.stats = stats
+        self.options = options
+
+        if stop is not None and deadline is not None:
+            self.halt = AnyOf(stop, deadline)
+        else:
+            self.halt = stop if stop is not None else deadline
+
+    def derive(self, **changes):
+        """A copy with some fields replaced, e.g. one iteration's depth"""
+        fields = {
+            'depth': self.depth,
+            'state_cls': self.state_cls,
+            'keep_tree': self.keep_tree,
+            'table': self.table,
+            'orderer': self.orderer,
+            'stop': self.stop,
+            'deadline': self.deadline,
+            'stats': self.stats,
+            **self.options,
+        }
+        fields.update(changes)
+        return SearchContext(**fields)
+
+    def option(self, name, default=None):
+        return self.options.get(name, default)
+
+    def root(self, board, *bounds):
+        """The root state for board, AI (MAX) to move"""
+        state = self.state_cls(board, 1, None, None, *bounds)
+        state.keep_tree = self.keep_tree
+        return state
+
+    def check(self):
+        if self.halt is not None and self.halt.expired():
+            raise SearchAborted()
@@ -0,0 +1,188 @@
+"""
+Exact endgame solver
+
+A game only ends when the board is full, and is won by the side with more
+fours, so a near-full position can be searched to the end instead of to a
+heuristic horizon.  solve() returns the exact final ai_fours - human_fours
+under perfect play by both sides (AI to move), and a move that achieves it.
+
+The search is a negamax alpha-beta on one mutable position: piece masks,
+column heights, the Zobrist key and its mirror image, and the running
+difference in fours, all updated by make / unmake.  Fours can never be
+undone, so that difference is exact at every node and the value of a full
+board is just the difference.  The solver keeps its own transposition
+table (the heuristic searches' values are on another scale), keyed by the
+canonical key so mirrored positions share entries, and orders moves as
+
+    1. the move stored in the table,
+    2. moves completing the most fours for the mover,
+    3. moves that do not hand the opponent a four in the cell above,
+    4. centre-out.
+
+/api/move solves once at most the request's endgameThreshold cells are
+empty (off by default: at the GUI's shallow depths the heuristic search is
+faster).  Up to ENDGAME_THRESHOLD empty cells a solve is still cheaper
+than a depth 8 alpha-beta search; tournament players use it, and the
+server rejects larger thresholds.
+"""
+
+from state import ROWS, COLS, ZOBRIST, SIDE_KEY, mirror_move
+from bitboard import H, board_to_masks, cell_bit, count_windows, CELL_WINDOWS
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+from ordering import CENTER_RANK
+from context import SearchContext
+
+INF = 1e18
+
+# Empty cells at or below which a solve is worth it against a deep search
+ENDGAME_THRESHOLD = 14
+
+# Entries in the solver's own transposition table
+TABLE_SIZE = 1 << 20
+
+
+def empty_cells(board):
+    return sum(row.count(0) for row in board)
+
+
+def should_solve(board, threshold = ENDGAME_THRESHOLD):
+    """True when board is late enough for solve() (threshold 0 disables it)"""
+    return 0 < empty_cells(board) <= threshold
+
+
+def solve(board, ctx: SearchContext = None, table = None):
+    """
+    Solve board with the AI to move.  Returns (value, action, root_state,
+    expanded) like the search engines, with value the exact final four
+    difference.  ctx supplies state_cls, stop, deadline and stats (its
+    depth, table and orderer do not apply); table is the solver's TranspositionTable, a
+    fresh one of TABLE_SIZE entries by default.  No tree is built.
+    """
+    if ctx is None:
+        ctx = SearchContext()
+    root = ctx.root(board)
+    empty = empty_cells(board)
+    if ctx.stats is not None:
+        ctx.stats.start(empty)
+
+    solver = EndgameSolver(board, root.key, root.mirror_key, ctx, table)
+    value, action, expanded = solver.search(empty, 1, -INF, INF, root.distinct_actions())
+    root.value = value
+    return value, action, root, expanded
+
+
+class EndgameSolver:
+    """The mutable position and table of one solve()"""
+
+    def __init__(self, board, key, mirror_key, ctx, table=None):
+        self.ai, self.human, heights = board_to_masks(board)
+        self.heights = list(heights)
+        self.key = key
+        self.mirror_key = mirror_key
+        counts = count_windows(self.ai, self.human)
+        self.diff = counts[0] - counts[4]
+        self.ctx = ctx
+        self.stats = ctx.stats
+        self.table = table if table is not None else TranspositionTable(TABLE_SIZE)
+
+    def _fours(self, col, player):
+        """Fours player would complete by dropping in col"""
+        bit = cell_bit(self.heights[col], col)
+        mine = (self.ai if player == 1 else self.human) | bit
+        return sum(1 for w in CELL_WINDOWS[bit] if w & mine == w)
+
+    def _order(self, actions, player, hash_move):
+        def rank(c):
+            gives = 0
+            if self.heights[c] + 1 < ROWS:
+                self._make(c, player, 0)
+                gives = self._fours(c, -player)
+                self._unmake(c, player, 0)
+            return (c != hash_move, -self._fours(c, player), gives, CENTER_RANK[c])
+        return sorted(actions, key=rank)
+
+    def _make(self, col, player, fours):
+        r = self.heights[col]
+        bit = 1 << (col * H + r)
+        if player == 1:
+            self.ai |= bit
+        else:
+            self.human |= bit
+        self.heights[col] = r + 1
+        self.key ^= ZOBRIST[r][col][player] ^ SIDE_KEY
+        self.mirror_key ^= ZOBRIST[r][mirror_move(col)][player] ^ SIDE_KEY
+        self.diff += player * fours
+
+    def _unmake(self, col, player, fours):
+        r = self.heights[col] - 1
+        bit = 1 << (col * H + r)
+        if player == 1:
+            self.ai ^= bit
+        else:
+            self.human ^= bit
+        self.heights[col] = r
+        self.key ^= ZOBRIST[r][col][player] ^ SIDE_KEY
+        self.mirror_key ^= ZOBRIST[r][mirror_move(col)][player] ^ SIDE_KEY
+        self.diff -= player * fours
+
+    def search(self, empty, player, alpha, beta, actions=None):
+        """
+        Negamax over the remaining empty cells.  Returns (score, action,
+        expanded) with score the final four difference for player, the side
+        to move; AI (player 1) scores are the ai - human difference.
+        """
+        self.ctx.check()
+        stats = self.stats
+        if stats is not None:
+            stats.node(empty)
+        if empty == 0:
+            return player * self.diff, None, 1
+
+        key, mirrored = (self.mirror_key, True) if self.mirror_key < self.key else (self.key, False)
+        alpha0 = alpha
+        hash_move = None
+        entry = self.table.probe(key)
+        if entry is not None:
+            _, _, value, flag, hash_move = entry
+            if mirrored and hash_move is not None:
+                hash_move = mirror_move(hash_move)
+            if flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha):
+                return value, hash_move, 1
+
+        if actions is None:
+            actions = [c for c in range(COLS) if self.heights[c] < ROWS]
+        actions = self._order(actions, player, hash_move)
+
+        best = -INF
+        best_action = None
+        expanded = 0
+        searched = 0
+        for c in actions:
+            fours = self._fours(c, player)
+            self._make(c, player, fours)
+            v, _, ex = self.search(empty - 1, -player, -beta, -alpha)
+            self._unmake(c, player, fours)
+            v = -v
+            expanded += ex
+            searched += 1
+
+            if best < v:
+                best, best_action = v, c
+                alpha = max(alpha, best)
+            if alpha >= beta:
+                if stats is not None:
+                    stats.cutoffs += 1
+                break
+
+        if best <= alpha0:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        stored = mirror_move(best_action) if mirrored else best_action
+        self.table.store(key, empty, best, flag, stored)
+
+        if stats is not None:
+            stats.exit(searched)
+        return best, best_action, expanded
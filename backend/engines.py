@@ -0,0 +1,74 @@
+"""
+The search engines by name, shared by the server, the benchmark and the
+tournament
+
+    ENGINES      'engine' request / CLI name -> position representation
+    ALGORITHMS   search name -> search(board, k, state_cls, keep_tree=True),
+                 returning (value, action, root_state, expanded)
+    search_name  the server's (algorithm, useAlphaBeta) -> ALGORITHMS name
+"""
+
+from state import Connect4State
+from bitboard import BitboardState, IncrementalBitboardState
+from ordering import MoveOrderer
+from transposition import TranspositionTable
+from context import SearchContext
+import minimax
+import alpha_beta
+import expected_minimax
+import expected_alpha_beta
+import pvs
+import stack_search
+import endgame
+
+ENGINES = {
+    'bitboard': BitboardState,
+    'incremental': IncrementalBitboardState,
+    'list': Connect4State,
+}
+
+
+def _alpha_beta_tt(board, k, state_cls, keep_tree=True):
+    ctx = SearchContext(k, state_cls, keep_tree, TranspositionTable(), MoveOrderer())
+    return alpha_beta.minimax(board, ctx)
+
+
+def _alpha_beta_endgame(board, k, state_cls, keep_tree=True):
+    """alpha_beta, handing over to the exact solver from ENDGAME_THRESHOLD empty cells"""
+    ctx = SearchContext(k, state_cls, keep_tree)
+    if endgame.should_solve(board):
+        return endgame.solve(board, ctx)
+    return alpha_beta.minimax(board, ctx)
+
+
+def _pvs_tt(board, k, state_cls, keep_tree=True):
+    return pvs.minimax(board, SearchContext(k, state_cls, keep_tree, TranspositionTable()))
+
+
+def _plain(engine):
+    """The engine's minimax() with nothing but depth, state class and keep_tree set"""
+    def search(board, k, state_cls, keep_tree=True):
+        return engine.minimax(board, SearchContext(k, state_cls, keep_tree))
+    return search
+
+
+ALGORITHMS = {
+    'minimax': _plain(minimax),
+    'alpha_beta': _plain(alpha_beta),
+    'alpha_beta_tt': _alpha_beta_tt,
+    'alpha_beta_eg': _alpha_beta_endgame,
+    'stack_search': _plain(stack_search),
+    'pvs': _plain(pvs),
+    'pvs_tt': _pvs_tt,
+    'expected_minimax': _plain(expected_minimax),
+    'expected_alpha_beta': _plain(expected_alpha_beta),
+}
+
+
+def search_name(algorithm, use_alpha_beta):
+    """The ALGORITHMS name of a request's 'algorithm' and 'useAlphaBeta'"""
+    if algorithm == 'expectiminimax':
+        return 'expected_alpha_beta' if use_alpha_beta else 'expected_minimax'
+    if algorithm == 'pvs':
+        return 'pvs'
+    return 'alpha_beta' if use_alpha_beta else 'minimax'
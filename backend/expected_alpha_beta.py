@@ -1,55 +1,263 @@
-from state import Connect4State
+from state import Connect4State, COLS
+from transposition import EXACT, LOWER, UPPER
+from ordering import CENTER_RANK
+from context import SearchContext
+from stats import evaluate
 
 INF = 1e18
-K = 10
 
-def minimax(board, depth = K):
-    state = Connect4State(board, 1, None, None, -INF, INF)
-    value, action, expanded = max_value(state, depth, -INF, INF)
+# |heuristic()| can not exceed this (at most 1501 per window), and every
+# node value is a max / min / weighted mix of heuristic values, so all
+# values lie in [-BOUND, BOUND]
+BOUND = 69 * 1501
+
+# Margin on every pruning decision, far above the rounding error of the
+# bound arithmetic, so ties are always resolved exactly
+EPS = 1e-6
+
+def minimax(board, ctx: SearchContext = None):
+    if ctx is None:
+        ctx = SearchContext()
+    state = ctx.root(board, -INF, INF)
+    if ctx.stats is not None:
+        ctx.stats.start(ctx.depth)
+    value, action, expanded = max_value(state, ctx.depth, -INF, INF, ctx)
     return value, action, state, expanded
 
-def max_value(state: Connect4State, depth, alpha, beta):
-    if (state.is_terminal() or depth == 0):
-        return state.heuristic(), None, 1
-    
-    rv = -INF
-    best_action = None
-    expanded = 0
+def max_value(state: Connect4State, depth, alpha, beta, ctx: SearchContext):
+    value, _, action, expanded = _search(state, depth, alpha, beta, ctx)
+    return value, action, expanded
 
-    for c in state.available_actions():
-        v2, _, ex = min_value(state.transition(c, alpha, beta), depth-1, alpha, beta)
-        expanded += ex
+def min_value(state: Connect4State, depth, alpha, beta, ctx: SearchContext):
+    value, _, action, expanded = _search(state, depth, alpha, beta, ctx)
+    return value, action, expanded
+
+# flag of a result seen from the other side
+_FLIPPED = {EXACT: EXACT, LOWER: UPPER, UPPER: LOWER}
+
+# _mix() of every set of available columns met so far
+_MIXES = {}
+
+
+def _mix(actions):
+    """
+    How the expected values of a node with the available columns actions
+    are mixed, worked out once per set of columns: (order, neighbours,
+    feeds) where order is actions centre-out, neighbours[c] the (left,
+    right) columns mixed into c's expected value (None for a full or
+    missing neighbour) and feeds[j] the [(c, weight of j in c's expected
+    value)] of every expected value containing j.
+    """
+    key = tuple(actions)
+    mix = _MIXES.get(key)
+    if mix is None:
+        neighbours = [None] * COLS
+        for c in actions:
+            neighbours[c] = (c - 1 if c - 1 in actions else None, c + 1 if c + 1 in actions else None)
+        feeds = [None] * COLS
+        for j in actions:
+            feeds[j] = []
+            for c in (j - 1, j, j + 1):
+                if c not in actions:
+                    continue
+                mixed = 1 + sum(n is not None for n in neighbours[c])
+                if c == j:
+                    weight = 1.0 if mixed == 1 else 0.6
+                else:
+                    weight = 0.4 if mixed == 2 else 0.2
+                feeds[j].append((c, weight))
+        order = sorted(actions, key=CENTER_RANK.__getitem__)
+        mix = _MIXES[key] = (order, neighbours, feeds)
+    return mix
 
-        if rv < v2:
-            rv, best_action = v2, c
-            alpha = max(alpha, rv)
 
-        if (alpha >= beta):
-            rv , best_action = state.calulate_value()
-            return rv, best_action, expanded
+def _expected(values, c, neighbours):
+    """
+    calculate_child_expected() of column c over the per-column values, with
+    the same floating point operations so exact values match bit for bit
+    """
+    left, right = neighbours[c]
+    if left is None and right is None:
+        return values[c]
+    elif left is None:
+        return values[right] * 0.4 + 0.6 * values[c]
+    elif right is None:
+        return values[left] * 0.4 + 0.6 * values[c]
+    return values[left] * 0.2 + 0.2 * values[right] + 0.6 * values[c]
 
-    rv , best_action = state.calulate_value()
-    return rv, best_action, expanded
 
-def min_value(state: Connect4State, depth, alpha, beta):
+def _window(lo, hi, elo, ehi, j, alpha, beta, live, feeds):
+    """
+    Star1 window for child j from the current bounds of its siblings.  At
+    or above the upper end, one expected value containing j reaches beta;
+    at or below the lower end, every live expected value containing j stays
+    under alpha.
+    """
+    a = b = INF
+    lo_j, hi_j = lo[j], hi[j]
+    for c, w in feeds[j]:
+        if not live[c]:
+            continue
+        # c's expected bounds without j's share
+        rest_lo = elo[c] - w * lo_j
+        rest_hi = ehi[c] - w * hi_j
+        a = min(a, (alpha - EPS - rest_hi) / w)
+        b = min(b, (beta + EPS - rest_lo) / w)
+    if a >= b:
+        a = b - 1
+    return a, b
+
+def _search(state: Connect4State, depth, alpha, beta, ctx: SearchContext):
+    """
+    Expectiminimax with Star1 pruning.  Returns (value, flag, action,
+    expanded) where flag says whether value is EXACT or only a LOWER /
+    UPPER bound (for results outside the (alpha, beta) window).
+
+    The value of a node is the max (AI) / min (human) over its moves c of
+        0.6 * v(c) + 0.2 * v(c-1) + 0.2 * v(c+1)
+    (see Connect4State.calculate_child_expected), so every child feeds up to
+    three expected values.  Children are searched centre-out, each with the
+    window that would let its result cut the node or rule its expected
+    values out, given the [lower, upper] bounds known for its siblings
+    (initially +-BOUND).  Bounds that are not enough are re-searched with a
+    full window before an exact value is returned, so exact results are
+    identical to expected_minimax's.
+    """
+    ctx.check()
+    stats = ctx.stats
+    if stats is not None:
+        stats.node(depth)
     if (state.is_terminal() or depth == 0):
-       return state.heuristic(), None, 1
-    
-    rv = INF
-    best_action = None
+        return evaluate(state, stats), EXACT, None, 1
+
+    # Everything below is in the node's own perspective, score = sign * value,
+    # so the node always maximizes.  Negation is exact in floating point.
+    sign = state.player
+    if sign == 1:
+        a, b = alpha, beta
+    else:
+        a, b = -beta, -alpha
+
+    actions = state.available_actions()
+    order, neighbours, feeds = _mix(actions)
+
+    # Per-column bounds of the children's values and of the expected values
+    # built from them (elo / ehi), all kept up to date in place
+    # (-INF for full columns, so max() can run over every column)
+    lo = [-BOUND] * COLS
+    hi = [BOUND] * COLS
+    elo = [-INF] * COLS
+    ehi = [-INF] * COLS
+    for c in actions:
+        elo[c] = _expected(lo, c, neighbours)
+        ehi[c] = _expected(hi, c, neighbours)
+    children = [None] * COLS
+    searched = [False] * COLS
     expanded = 0
 
-    for c in state.available_actions():
-        v2, _, ex = max_value(state.transition(c, alpha, beta), depth-1, alpha, beta)
+    def search_child(j, ca, cb):
+        nonlocal expanded
+        child = children[j]
+        if child is None:
+            child = state.transition(j)
+            children[j] = child
+        else:
+            child.children = []
+            child.value = None
+        if depth == 1:
+            # A leaf is exact whatever its window
+            ctx.check()
+            if stats is not None:
+                stats.node(0)
+            v, flag, ex = evaluate(child, stats), EXACT, 1
+        elif sign == 1:
+            v, flag, _, ex = _search(child, depth-1, ca, cb, ctx)
+        else:
+            v, flag, _, ex = _search(child, depth-1, -cb, -ca, ctx)
+            flag = _FLIPPED[flag]
         expanded += ex
+        searched[j] = True
+        s = sign * v
+        old_lo, old_hi = lo[j], hi[j]
+        if flag == EXACT:
+            lo[j] = hi[j] = s
+        elif flag == LOWER:
+            lo[j] = max(old_lo, s)
+        else:
+            hi[j] = min(old_hi, s)
+        # Only steer the pruning (every decision has an EPS margin), so
+        # the expected bounds are shifted by the change instead of mixed
+        # again; exact values are mixed with _expected() at the end
+        d_lo, d_hi = lo[j] - old_lo, hi[j] - old_hi
+        for c, w in feeds[j]:
+            elo[c] += w * d_lo
+            ehi[c] += w * d_hi
+
+    for j in order:
+        lower = max(elo)
+        if lower >= b + EPS:
+            break
+        floor = max(a, lower)
+        # live[c]: expected value c can still be the best one
+        cut = floor - EPS
+        live = [e > cut for e in ehi]
+        if not any([live[c] for c, _ in feeds[j]]):
+            continue
+        if depth == 1:
+            search_child(j, -INF, INF)
+        else:
+            search_child(j, *_window(lo, hi, elo, ehi, j, floor, b, live, feeds))
 
-        if rv > v2:
-            rv, best_action = v2, c
-            beta = min(beta, rv)
+    result = None
+    while True:
+        lower = max(elo)
+        upper = max(ehi)
+        if lower >= b + EPS:
+            result = lower, LOWER
+            break
+        if upper <= a - EPS:
+            result = upper, UPPER
+            break
 
-        if (alpha >= beta):
-                rv , best_action = state.calulate_value()
-                return rv, best_action, expanded
+        floor = max(a, lower)
+        cut = floor - EPS
+        live = [e > cut for e in ehi]
+        pending = [j for j in actions if lo[j] != hi[j] and any([live[c] for c, _ in feeds[j]])]
+        if not pending:
+            break
+        j = pending[0]
+        if searched[j] or depth == 1:
+            search_child(j, -INF, INF)
+        else:
+            search_child(j, *_window(lo, hi, elo, ehi, j, floor, b, live, feeds))
+
+    best_action = None
+    if result is not None:
+        if stats is not None:
+            stats.cutoffs += 1
+        score, flag = result
+    else:
+        # Every live expected value is now exact; dominated ones stay below it
+        score = -INF
+        for c in actions:
+            if live[c]:
+                e = _expected(lo, c, neighbours)
+                children[c].expected_value = sign * e
+                if score < e:
+                    score, best_action = e, c
+        dominated = [ehi[c] for c in actions if not live[c]]
+        if dominated and max(dominated) >= score:
+            score, flag = upper, UPPER
+        else:
+            flag = EXACT
 
-    rv , best_action = state.calulate_value()
-    return rv, best_action, expanded
\ No newline at end of file
+    value = sign * score
+    if sign == -1:
+        flag = _FLIPPED[flag]
+    state.value = value
+    if state.parent is None:
+        state.expected_value = value
+    if stats is not None:
+        stats.leave(state)
+    state.drop_children()
+    return value, flag, best_action, expanded
@@ -1,16 +1,25 @@
 from state import Connect4State
+from context import SearchContext
+from stats import evaluate
 
 INF = 1e18
-K = 10
 
-def minimax(board, depth = K):
-    state = Connect4State(board, 1, None, None)
-    value, action, expanded = max_value(state, depth)
+def minimax(board, ctx: SearchContext = None):
+    if ctx is None:
+        ctx = SearchContext()
+    state = ctx.root(board)
+    if ctx.stats is not None:
+        ctx.stats.start(ctx.depth)
+    value, action, expanded = max_value(state, ctx.depth, ctx)
     return value, action, state, expanded
 
-def max_value(state: Connect4State, depth):
+def max_value(state: Connect4State, depth, ctx: SearchContext):
+    ctx.check()
+    stats = ctx.stats
+    if stats is not None:
+        stats.node(depth)
     if (state.is_terminal() or depth == 0):
-        return state.heuristic(), None, 1
+        return evaluate(state, stats), None, 1
         
     
     rv = -INF
@@ -18,23 +27,33 @@ def max_value(state: Connect4State, depth):
     expanded = 0
 
     for c in state.available_actions():
-        _, _, ex = min_value(state.transition(c), depth-1)
+        _, _, ex = min_value(state.transition(c), depth-1, ctx)
         expanded += ex
        
     rv, best_action = state.calulate_value()
+    if stats is not None:
+        stats.leave(state)
+    state.drop_children()
     return rv, best_action, expanded
 
-def min_value(state: Connect4State, depth):
+def min_value(state: Connect4State, depth, ctx: SearchContext):
+    ctx.check()
+    stats = ctx.stats
+    if stats is not None:
+        stats.node(depth)
     if (state.is_terminal() or depth == 0):
-        return state.heuristic(), None, 1
+        return evaluate(state, stats), None, 1
     
     rv = INF
     best_action = None
     expanded = 0
 
     for c in state.available_actions():
-        _, _, ex = max_value(state.transition(c), depth-1)
+        _, _, ex = max_value(state.transition(c), depth-1, ctx)
         expanded += ex
         
     rv , best_action = state.calulate_value()
+    if stats is not None:
+        stats.leave(state)
+    state.drop_children()
     return rv, best_action, expanded
\ No newline at end of file
@@ -0,0 +1,60 @@
+import time
+
+from ordering import MoveOrderer
+from context import SearchContext
+from search_control import SearchAborted
+import alpha_beta
+
+
+def iterative_deepening(board, ctx: SearchContext):
+    """
+    Run alpha_beta at depth 1, 2, 3, ... until ctx.depth or until
+    ctx.deadline passes, and return the deepest completed result as
+    (value, action, root_state, expanded, iterations).
+
+    The best root move of every finished iteration is remembered by the
+    orderer (and by the transposition table, if any) so the next iteration
+    tries it first.  expanded is the total over the completed iterations and
+    iterations holds one {depth, timeMs, expanded, value, move} dict each.
+    Depth 1 is always completed, even if the budget is already spent.
+
+    ctx.stop is an optional external stop condition (e.g. a CancelToken);
+    when it fires the search raises SearchAborted instead of returning a
+    result.  ctx.stats, if given, accumulates over all iterations, the
+    aborted one included.
+    """
+    orderer = ctx.orderer
+    if orderer is None:
+        orderer = MoveOrderer(center=False, killers=False, history=False)
+
+    empty = sum(row.count(0) for row in board)
+    max_depth = max(1, min(ctx.depth, empty))
+
+    result = None
+    expanded = 0
+    iterations = []
+
+    for depth in range(1, max_depth + 1):
+        start = time.perf_counter()
+        try:
+            iteration = ctx.derive(depth=depth, orderer=orderer, deadline=ctx.deadline if result is not None else None)
+            value, action, root_state, ex = alpha_beta.minimax(board, iteration)
+        except SearchAborted:
+            if ctx.stop is not None and ctx.stop.expired():
+                raise
+            break
+
+        expanded += ex
+        iterations.append({
+            'depth': depth,
+            'timeMs': round((time.perf_counter() - start) * 1000, 3),
+            'expanded': ex,
+            'value': value,
+            'move': action,
+        })
+        result = value, action, root_state
+        if action is not None:
+            orderer.pv[root_state.key] = action
+
+    value, action, root_state = result
+    return value, action, root_state, expanded, iterations
@@ -0,0 +1,169 @@
+import itertools
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from search_control import CancelToken, SearchAborted
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+CANCELLED = 'cancelled'
+FAILED = 'failed'
+
+FINISHED = (DONE, CANCELLED, FAILED)
+
+
+class QueueFull(Exception):
+    """Raised by JobManager.submit() when max_queue jobs are already waiting."""
+
+
+class Job:
+    """
+    One submitted search.  The job's CancelToken is the stop condition the
+    search polls at every node, so cancel() takes effect at the next node.
+    """
+
+    def __init__(self, job_id, data):
+        self.id = job_id
+        self.data = data
+        self.status = QUEUED
+        self.token = CancelToken()
+        self.future = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    def to_dict(self):
+        job = {
+            'id': self.id,
+            'status': self.status,
+            'createdAt': self.created,
+            'startedAt': self.started,
+            'finishedAt': self.finished,
+        }
+        if self.result is not None:
+            job['result'] = self.result
+        if self.error is not None:
+            job['error'] = self.error
+        return job
+
+
+class JobManager:
+    """
+    Runs searches on a bounded thread pool.  At most `workers` jobs run at
+    once and at most `max_queue` more wait for a thread; submit() raises
+    QueueFull beyond that.  Finished jobs are kept for polling, the oldest
+    being forgotten once there are more than `keep_finished` of them.
+
+    run(data, stop) does the actual search and returns (status_code, body);
+    a status code of 400 or more marks the job failed.
+    """
+
+    def __init__(self, run, workers=2, max_queue=16, keep_finished=256):
+        self.run = run
+        self.workers = workers
+        self.max_queue = max_queue
+        self.keep_finished = keep_finished
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='search-job')
+
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.counter = itertools.count()
+
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+
+    def _count(self, status):
+        return sum(1 for job in self.jobs.values() if job.status == status)
+
+    def submit(self, data):
+        with self.lock:
+            if self._count(QUEUED) >= self.max_queue:
+                self.rejected += 1
+                raise QueueFull()
+            job = Job(f"{next(self.counter)}-{uuid.uuid4().hex[:8]}", data)
+            self.jobs[job.id] = job
+            self.submitted += 1
+            self._purge()
+            job.future = self.executor.submit(self._execute, job)
+        return job
+
+    def _execute(self, job):
+        with self.lock:
+            if job.status != QUEUED:
+                return
+            job.status = RUNNING
+            job.started = time.time()
+
+        try:
+            status_code, body = self.run(job.data, job.token)
+        except SearchAborted:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            self._finish(job, FAILED, error=str(e))
+        else:
+            if status_code >= 400:
+                self._finish(job, FAILED, error=body.get('error', f"status {status_code}"))
+            else:
+                self._finish(job, DONE, result=body)
+
+    def _finish(self, job, status, result=None, error=None):
+        with self.lock:
+            job.status = status
+            job.result = result
+            job.error = error
+            job.finished = time.time()
+            if status == DONE:
+                self.completed += 1
+            elif status == CANCELLED:
+                self.cancelled += 1
+            else:
+                self.failed += 1
+
+    def _purge(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINISHED]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        Cancel a queued or running job.  Returns the job, or None if the id
+        is unknown.  A running search stops at its next node.
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            job.token.cancel()
+            if job.status == QUEUED:
+                job.future.cancel()
+                job.status = CANCELLED
+                job.finished = time.time()
+                self.cancelled += 1
+            return job
+
+    def stats(self):
+        with self.lock:
+            return {
+                'workers': self.workers,
+                'maxQueue': self.max_queue,
+                'queued': self._count(QUEUED),
+                'running': self._count(RUNNING),
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'completed': self.completed,
+                'cancelled': self.cancelled,
+                'failed': self.failed,
+            }
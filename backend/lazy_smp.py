@@ -0,0 +1,335 @@
+"""
+Lazy SMP: several processes on the same alpha-beta search
+
+Root splitting (parallel.py) gives every worker a different subtree.  Lazy
+SMP instead runs the whole iterative-deepening alpha_beta search once in
+this process and once in each of threads - 1 helper processes, all sharing
+one transposition table.  The helpers do not coordinate with the main
+search.  Each one fills the table with results the others would have had
+to compute: odd helpers search one ply deeper than even ones, and every
+helper breaks ordering ties in its own random order.  The main search
+reuses those entries and only its result is returned.  Once it finishes,
+a shared stop flag ends the helpers.
+
+The table lives in multiprocessing.shared_memory as two 64-bit words per
+slot, (key ^ data, data), where data packs value, depth, flag and move.
+Writers never lock.  A reader accepts a slot only when its first word XOR
+its second gives back the probed key, so an entry torn by two concurrent
+writers looks like a miss instead of a wrong value.
+
+A table entry can come from a helper that searched deeper than the main
+search.  Lazy SMP values therefore need not equal a fixed-depth alpha_beta
+search's, though they are never from a shallower one.
+
+    python3 lazy_smp.py --threads 1 2 4 --k 7    # speedup on the benchmark positions
+"""
+
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import wait
+from multiprocessing.shared_memory import SharedMemory
+
+from state import COLS
+from transposition import REPLACE_DEPTH, POLICIES
+from ordering import MoveOrderer
+from context import SearchContext
+from search_control import SearchAborted, SharedFlag
+from stats import SearchStats
+import alpha_beta
+import iterative
+import parallel
+
+# Default slots in the shared table (16 bytes each)
+TABLE_SIZE = 1 << 20
+
+# data word: value + VALUE_BIAS in bits 0-31, depth 32-39, flag 40-41,
+# move 42-44 (NO_MOVE for None) and an occupied bit, so no entry is 0
+VALUE_BIAS = 1 << 31
+NO_MOVE = COLS
+OCCUPIED = 1 << 45
+MASK64 = (1 << 64) - 1
+
+
+class SharedTranspositionTable:
+    """
+    TranspositionTable over shared memory, usable from several processes at
+    once.  Same probe / store / stats interface and replacement policies;
+    values must be integers that fit in 32 bits (others are not stored).
+    The creating process owns the memory and must unlink() it.  Pickling
+    sends only the name, and unpickling attaches to the same memory.  The
+    hit / miss counters are per process.
+    """
+
+    def __init__(self, size=TABLE_SIZE, policy=REPLACE_DEPTH, name=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown replacement policy: {policy}")
+        self.size = size
+        self.policy = policy
+        if name is None:
+            self.shm = SharedMemory(create=True, size=16 * size)
+        else:
+            self.shm = SharedMemory(name=name)
+        self.words = self.shm.buf.cast('Q')
+
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def __getstate__(self):
+        return self.shm.name, self.size, self.policy
+
+    def __setstate__(self, state):
+        name, size, policy = state
+        self.__init__(size, policy, name)
+
+    def _read(self, index):
+        check, data = self.words[2 * index], self.words[2 * index + 1]
+        if not data:
+            return None, data
+        return check ^ data, data
+
+    def probe(self, key):
+        stored, data = self._read(key % self.size)
+        if stored is None:
+            self.misses += 1
+            return None
+        if stored != key:
+            self.collisions += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        value = (data & 0xffffffff) - VALUE_BIAS
+        move = (data >> 42) & 7
+        return key, (data >> 32) & 0xff, value, (data >> 40) & 3, None if move == NO_MOVE else move
+
+    def store(self, key, depth, value, flag, move):
+        if value != int(value) or not -VALUE_BIAS <= value < VALUE_BIAS:
+            return
+        index = key % self.size
+        stored, data = self._read(index)
+        if stored is not None and stored != key:
+            if self.policy == REPLACE_DEPTH and (data >> 32) & 0xff > depth:
+                return
+            self.replacements += 1
+        move = NO_MOVE if move is None else move
+        data = OCCUPIED | move << 42 | flag << 40 | depth << 32 | (int(value) + VALUE_BIAS)
+        # Data first: until the check word is written a reader sees a miss
+        self.words[2 * index + 1] = data
+        self.words[2 * index] = (key ^ data) & MASK64
+        self.stores += 1
+
+    def clear(self):
+        self.shm.buf[:] = bytes(len(self.shm.buf))
+
+    def stats(self):
+        return {
+            'size': self.size,
+            'policy': self.policy,
+            'hits': self.hits,
+            'misses': self.misses,
+            'collisions': self.collisions,
+            'stores': self.stores,
+            'replacements': self.replacements,
+            'shared': True,
+        }
+
+    def close(self):
+        self.words.release()
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+class _HelperFlag(SharedFlag):
+    """
+    The helpers' stop flag, followed by one byte per helper that the helper
+    sets as soon as it runs, so search() knows which helpers to wait for
+    """
+
+    def __init__(self, helpers=0, name=None):
+        if name is None:
+            self.shm = SharedMemory(create=True, size=1 + helpers)
+        else:
+            self.shm = SharedMemory(name=name)
+
+    def mark_started(self, index):
+        if self.shm is not None:
+            self.shm.buf[index] = 1
+
+    def started(self, index):
+        return self.shm.buf[index] != 0
+
+
+class _HelperOrderer(MoveOrderer):
+    """MoveOrderer that breaks ties in a random order of its own, so helpers spread out"""
+
+    def __init__(self, seed):
+        super().__init__(center=False)
+        self.rng = random.Random(seed)
+
+    def order(self, state, actions, depth, hash_move=None):
+        actions = list(actions)
+        self.rng.shuffle(actions)
+        return super().order(state, actions, depth, hash_move)
+
+
+def _helper(board, index, ctx, table, flag, use_stats):
+    """
+    Worker side: iterative deepening alpha_beta on the shared table until
+    the flag is set or the last depth is done.  Odd helpers run every
+    iteration one ply deeper.  Returns (expanded, deepest completed depth,
+    stats).
+    """
+    flag.mark_started(index)
+    ctx = ctx.derive(table=table, orderer=_HelperOrderer(index), stop=flag,
+                     stats=SearchStats() if use_stats else None)
+    empty = sum(row.count(0) for row in board)
+    offset = index % 2
+    expanded = 0
+    reached = 0
+    try:
+        for depth in range(1 + offset, min(ctx.depth + offset, empty) + 1):
+            _, _, _, ex = alpha_beta.minimax(board, ctx.derive(depth=depth))
+            expanded += ex
+            reached = depth
+    except SearchAborted:
+        pass
+    finally:
+        table.close()
+        flag.close()
+    return expanded, reached, ctx.stats
+
+
+def _release_when_done(futures, table, flag):
+    """Close and unlink the shared memory once every future is done, now or from a done-callback"""
+    def release():
+        table.close()
+        table.unlink()
+        flag.close()
+        flag.unlink()
+
+    remaining = {future for future in futures if not future.done()}
+    if not remaining:
+        release()
+        return
+    lock = threading.Lock()
+
+    def done(future):
+        with lock:
+            remaining.discard(future)
+            if remaining:
+                return
+        release()
+
+    for future in list(remaining):
+        future.add_done_callback(done)
+
+
+def search(board, ctx: SearchContext = None, threads=None):
+    """
+    Lazy SMP iterative deepening alpha-beta on `threads` processes (default
+    parallel.WORKERS): this one plus threads - 1 helpers on the shared
+    process pool.  Helpers beyond the pool size only start once a worker
+    is free.  Returns (value, action, root_state, expanded, iterations)
+    like iterative.iterative_deepening(), which the main search is.
+    expanded also counts the helpers' nodes, and their stats are merged
+    into ctx.stats.
+
+    The shared table has ctx.table's size and policy, or TABLE_SIZE slots;
+    ctx.table itself is not used.  ctx.deadline and ctx.stop apply to the
+    main search, and the helpers stop with it.  search() only waits for
+    helpers that have started; the shared memory is freed once the rest
+    have been cancelled or have run (and stopped at once).
+    """
+    if ctx is None:
+        ctx = SearchContext()
+    threads = threads or parallel.WORKERS
+    if ctx.table is not None:
+        table = SharedTranspositionTable(ctx.table.size, ctx.table.policy)
+    else:
+        table = SharedTranspositionTable()
+    flag = _HelperFlag(threads - 1)
+
+    futures = []
+    try:
+        if threads > 1:
+            pool = parallel.get_pool()
+            # Like parallel's workers, helpers get the settings only
+            worker_ctx = ctx.derive(table=None, orderer=None, stats=None, stop=None, deadline=None)
+            futures = [pool.submit(_helper, board, index, worker_ctx, table, flag, ctx.stats is not None)
+                       for index in range(1, threads)]
+        value, action, root_state, expanded, iterations = iterative.iterative_deepening(
+            board, ctx.derive(table=table))
+    finally:
+        flag.set()
+        for future in futures:
+            future.cancel()
+        # Helpers still queued behind other pool work are not waited for
+        wait([future for index, future in enumerate(futures, 1) if flag.started(index)])
+        _release_when_done(futures, table, flag)
+
+    for future in futures:
+        if not future.done() or future.cancelled():
+            continue
+        ex, _, helper_stats = future.result()
+        expanded += ex
+        if ctx.stats is not None:
+            ctx.stats.merge(helper_stats)
+    return value, action, root_state, expanded, iterations
+
+
+def speedup(threads=(1, 2, 4), k=7, phases=None, repeat=1, log=None):
+    """
+    Time search() at every thread count on the benchmark positions.  Returns
+    one {position, phase, threads, timeMs, nodes, value, move, speedup} dict
+    per case.  speedup is relative to the first entry of threads.
+    """
+    from benchmark.positions import load_positions
+    from bitboard import BitboardState
+
+    cases = []
+    for name, phase, board in load_positions(phases):
+        base = None
+        for n in threads:
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                value, action, _, expanded, _ = search(board, SearchContext(k, BitboardState, False), n)
+                elapsed = time.perf_counter() - start
+                if best is None or elapsed < best:
+                    best = elapsed
+            base = base or best
+            case = {'position': name, 'phase': phase, 'threads': n, 'timeMs': round(best * 1000, 1),
+                    'nodes': expanded, 'value': value, 'move': action, 'speedup': round(base / best, 2)}
+            cases.append(case)
+            if log is not None:
+                log(f"{name:13} threads={n:<2} {case['timeMs']:10.1f} ms {expanded:9} nodes "
+                    f"value {value:7} move {action}  x{case['speedup']}")
+    return cases
+
+
+if __name__ == '__main__':
+    import json
+    import os
+
+    parser = argparse.ArgumentParser(description="Lazy SMP speedup on the benchmark positions")
+    parser.add_argument('--threads', nargs='+', type=int, default=[1, 2, 4])
+    parser.add_argument('--k', type=int, default=7)
+    parser.add_argument('--phases', nargs='+', choices=['opening', 'midgame', 'near-full'], default=None)
+    parser.add_argument('--repeat', type=int, default=1, help="timed runs per case (the best one counts)")
+    parser.add_argument('--json', action='store_true', help="print the cases as JSON")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} cores, pool of {parallel.WORKERS} workers")
+    cases = speedup(args.threads, args.k, args.phases, args.repeat, log=None if args.json else print)
+    if args.json:
+        print(json.dumps(cases, indent=1))
+    else:
+        for n in args.threads:
+            ratios = [c['speedup'] for c in cases if c['threads'] == n]
+            print(f"threads={n}: mean speedup x{sum(ratios) / len(ratios):.2f}")
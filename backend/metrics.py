@@ -0,0 +1,100 @@
+import threading
+
+# Upper bounds (seconds) of the search latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Cumulative histogram over fixed bucket bounds, as Prometheus expects"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(names, values):
+    return ','.join(f'{name}="{value}"' for name, value in zip(names, values))
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class Metrics:
+    """
+    Process-wide search metrics.  Every answered AI move is observed with
+    the algorithm that would have searched it, where the answer came from
+    (search / book / cache / ponder / batch), its latency and, for real searches,
+    its SearchStats.  render() returns the Prometheus text format.
+    """
+
+    LABELS = ('algorithm', 'source')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+
+        self.latency = {}
+        self.nodes = {}
+        self.cutoffs = {}
+        self.heuristic_calls = {}
+        self.heuristic_seconds = {}
+        self.peak_tree_size = {}
+
+    def observe(self, algorithm, source, seconds, stats=None):
+        key = (algorithm, source)
+        with self.lock:
+            if key not in self.latency:
+                self.latency[key] = Histogram(self.buckets)
+            self.latency[key].observe(seconds)
+
+            if stats is None:
+                return
+            self.nodes[algorithm] = self.nodes.get(algorithm, 0) + sum(stats.nodes)
+            self.cutoffs[algorithm] = self.cutoffs.get(algorithm, 0) + stats.cutoffs
+            self.heuristic_calls[algorithm] = self.heuristic_calls.get(algorithm, 0) + stats.heuristic_calls
+            self.heuristic_seconds[algorithm] = self.heuristic_seconds.get(algorithm, 0.0) + stats.heuristic_time
+            self.peak_tree_size[algorithm] = max(self.peak_tree_size.get(algorithm, 0), stats.peak_tree_size)
+
+    def _counter(self, lines, name, kind, help_text, values):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for algorithm, value in sorted(values.items()):
+            lines.append(f'{name}{{algorithm="{algorithm}"}} {_number(value)}')
+
+    def render(self):
+        lines = [
+            '# HELP c4_search_latency_seconds Time to answer an AI move.',
+            '# TYPE c4_search_latency_seconds histogram',
+        ]
+        with self.lock:
+            for key, histogram in sorted(self.latency.items()):
+                labels = _labels(self.LABELS, key)
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f'c4_search_latency_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'c4_search_latency_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'c4_search_latency_seconds_sum{{{labels}}} {_number(histogram.sum)}')
+                lines.append(f'c4_search_latency_seconds_count{{{labels}}} {histogram.count}')
+
+            self._counter(lines, 'c4_search_nodes_total', 'counter',
+                          'Nodes visited by searches.', self.nodes)
+            self._counter(lines, 'c4_search_cutoffs_total', 'counter',
+                          'Alpha-beta cutoffs.', self.cutoffs)
+            self._counter(lines, 'c4_heuristic_calls_total', 'counter',
+                          'Leaf evaluations.', self.heuristic_calls)
+            self._counter(lines, 'c4_heuristic_seconds_total', 'counter',
+                          'Time spent in heuristic().', self.heuristic_seconds)
+            self._counter(lines, 'c4_search_peak_tree_size', 'gauge',
+                          'Largest number of tree nodes held by one search.', self.peak_tree_size)
+        return '\n'.join(lines) + '\n'
@@ -1,44 +1,99 @@
-from state import Connect4State
+from state import Connect4State, mirror_move
+from transposition import EXACT
+from context import SearchContext
+from stats import evaluate
 
 INF = 1e18
-K = 10
 
-def minimax(board, depth = K):
-    
-    state = Connect4State(board, 1, None, None)
-    value, action, expanded = max_value(state, depth)
+def minimax(board, ctx: SearchContext = None):
+    if ctx is None:
+        ctx = SearchContext()
+    state = ctx.root(board)
+    if ctx.stats is not None:
+        ctx.stats.start(ctx.depth)
+    value, action, expanded = max_value(state, ctx.depth, ctx)
     return value, action, state, expanded
 
-def max_value(state: Connect4State, depth):
+def _probe(state, depth, table):
+    key, mirrored = state.canonical_key()
+    entry = table.probe(key)
+    if entry is None or entry[1] < depth:
+        return None, None
+    move = entry[4]
+    if mirrored and move is not None:
+        move = mirror_move(move)
+    return entry[2], move
+
+def _store(state, depth, table, value, action):
+    key, mirrored = state.canonical_key()
+    if mirrored and action is not None:
+        action = mirror_move(action)
+    table.store(key, depth, value, EXACT, action)
+
+def max_value(state: Connect4State, depth, ctx: SearchContext):
+    ctx.check()
+    table, stats = ctx.table, ctx.stats
+    if stats is not None:
+        stats.node(depth)
     if (state.is_terminal() or depth == 0):
-        return state.heuristic(), None, 1
+        return evaluate(state, stats), None, 1
+
+    if table is not None:
+        v, action = _probe(state, depth, table)
+        if v is not None:
+            state.value = v
+            return v, action, 1
     
     rv = -INF
     best_action = None
     expanded = 0
 
-    for c in state.available_actions():
-        v2, _, ex = min_value(state.transition(c), depth-1)
+    # The root of a symmetric position only needs one of each mirrored pair
+    actions = state.distinct_actions() if state.parent is None else state.available_actions()
+    for c in actions:
+        v2, _, ex = min_value(state.transition(c), depth-1, ctx)
         expanded += ex
         if rv < v2:
             rv, best_action = v2, c
 
+    if table is not None:
+        _store(state, depth, table, rv, best_action)
+
     state.value = rv
+    if stats is not None:
+        stats.leave(state)
+    state.drop_children()
     return rv, best_action, expanded
 
-def min_value(state: Connect4State, depth):
+def min_value(state: Connect4State, depth, ctx: SearchContext):
+    ctx.check()
+    table, stats = ctx.table, ctx.stats
+    if stats is not None:
+        stats.node(depth)
     if (state.is_terminal() or depth == 0):
-        return state.heuristic(), None, 1
+        return evaluate(state, stats), None, 1
+
+    if table is not None:
+        v, action = _probe(state, depth, table)
+        if v is not None:
+            state.value = v
+            return v, action, 1
     
     rv = INF
     best_action = None
     expaned = 0
 
     for c in state.available_actions():
-        v2, _, ex = max_value(state.transition(c), depth-1)
+        v2, _, ex = max_value(state.transition(c), depth-1, ctx)
         expaned += ex
         if rv > v2:
             rv, best_action = v2, c
 
+    if table is not None:
+        _store(state, depth, table, rv, best_action)
+
     state.value = rv
-    return rv, best_action, expaned
\ No newline at end of file
+    if stats is not None:
+        stats.leave(state)
+    state.drop_children()
+    return rv, best_action, expaned
@@ -0,0 +1,178 @@
+"""
+Precomputed opening book
+
+Offline, generate() walks every position reachable in up to `plies` moves
+(with either side starting) in which the AI is to move, searches each one
+with alpha_beta and writes the results to a binary file:
+
+    header      magic b'C4OB', version (uint8), plies (uint8), depth (uint8),
+                entry count (uint32)
+    entries     (key uint64, value float64, depth uint8, move int8), sorted
+                by key
+
+key is the canonical Zobrist key of the position with the AI (MAX) to move
+(state.canonical_hash(), shared by a board and its mirror image) and move
+is stored in that canonical orientation, as in the transposition table.  At runtime OpeningBook memory-maps the file and
+binary-searches it, so lookups cost a handful of page reads and no parsing.
+
+To build a book:  python3 opening_book.py --plies 4 --depth 8
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from state import canonical_hash, mirror_move
+from bitboard import BitboardState
+from ordering import MoveOrderer
+from transposition import TranspositionTable
+from context import SearchContext
+import alpha_beta
+import parallel
+
+MAGIC = b'C4OB'
+VERSION = 2
+HEADER = struct.Struct('<4sBBBI')
+ENTRY = struct.Struct('<QdBb')
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'opening_book.bin')
+
+
+def book_positions(plies):
+    """
+    Every distinct board with at most `plies` pieces, reachable with either
+    side moving first, in which it is the AI's turn, up to mirror images.
+    Returns {canonical key: board}.
+    """
+    positions = {}
+    seen = set()
+
+    def walk(state, ply):
+        key, _ = state.canonical_key()
+        if key in seen:
+            return
+        seen.add(key)
+        if state.player == 1:
+            positions[key] = state.board
+        if ply == plies or state.is_terminal():
+            return
+        for child in state.neighbors():
+            walk(child, ply + 1)
+
+    walk(BitboardState(player=1), 0)
+    walk(BitboardState(player=-1), 0)
+    return positions
+
+
+def _search_position(args):
+    key, board, depth = args
+    ctx = SearchContext(depth, BitboardState, keep_tree=False, table=TranspositionTable(), orderer=MoveOrderer())
+    value, action, _, _ = alpha_beta.minimax(board, ctx)
+    if action is not None and canonical_hash(board, 1)[1]:
+        action = mirror_move(action)
+    return key, value, action
+
+
+def generate(path=DEFAULT_PATH, plies=4, depth=8, workers=None):
+    positions = book_positions(plies)
+    jobs = [(key, board, depth) for key, board in positions.items()]
+
+    entries = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=parallel.pool_context()) as pool:
+        for key, value, action in pool.map(_search_position, jobs, chunksize=16):
+            if action is not None:
+                entries.append((key, value, depth, action))
+
+    entries.sort()
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, plies, depth, len(entries)))
+        for entry in entries:
+            f.write(ENTRY.pack(*entry))
+    return len(entries)
+
+
+class OpeningBook:
+    """
+    Read-only view of a book file through mmap.  lookup() returns
+    (value, depth, move) or None, and counts lookups and hits.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.plies, self.depth, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} opening book")
+
+        self.lookups = 0
+        self.hits = 0
+
+    def _key_at(self, i):
+        return struct.unpack_from('<Q', self.data, HEADER.size + i * ENTRY.size)[0]
+
+    def lookup(self, board):
+        self.lookups += 1
+        key, mirrored = canonical_hash(board, 1)
+
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self.count or self._key_at(lo) != key:
+            return None
+
+        _, value, depth, move = ENTRY.unpack_from(self.data, HEADER.size + lo * ENTRY.size)
+        if mirrored:
+            move = mirror_move(move)
+        self.hits += 1
+        return value, depth, move
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'entries': self.count,
+            'plies': self.plies,
+            'depth': self.depth,
+            'lookups': self.lookups,
+            'hits': self.hits,
+        }
+
+    def close(self):
+        self.data.close()
+
+
+def load_book(path=None):
+    """
+    Open the book at path (default: $C4_OPENING_BOOK or opening_book.bin next
+    to this file).  Returns None when there is no book to load, or when the
+    file is not a book of the current version (regenerate it).
+    """
+    path = path or os.environ.get('C4_OPENING_BOOK', DEFAULT_PATH)
+    if not os.path.exists(path):
+        return None
+    try:
+        return OpeningBook(path)
+    except ValueError as e:
+        print(f"opening book not loaded: {e}")
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate the Connect4 opening book")
+    parser.add_argument('--plies', type=int, default=4, help="deepest opening position to store")
+    parser.add_argument('--depth', type=int, default=8, help="alpha-beta depth used for every position")
+    parser.add_argument('--workers', type=int, default=None, help="search processes (default: all cores)")
+    parser.add_argument('--out', default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    start = time.time()
+    count = generate(args.out, args.plies, args.depth, args.workers)
+    print(f"wrote {count} positions to {args.out} in {time.time() - start:.1f}s")
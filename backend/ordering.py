@@ -0,0 +1,78 @@
+from state import COLS
+
+# Static centre-out column order: 3, 2, 4, 1, 5, 0, 6
+CENTER_ORDER = sorted(range(COLS), key=lambda c: abs(c - COLS // 2))
+CENTER_RANK = {c: i for i, c in enumerate(CENTER_ORDER)}
+
+
+class MoveOrderer:
+    """
+    Pluggable move ordering for alpha_beta.  Moves are tried as
+
+        1. the hash / PV move (from the transposition table or from the best
+           moves remembered by a previous iteration),
+        2. the killer moves that caused a cutoff at the same ply,
+        3. the rest by history score, ties broken centre-out.
+
+    Each part can be switched off; with all of them off the order is the
+    plain 0..6 column order alpha_beta used before.
+    """
+
+    def __init__(self, center=True, pv=True, killers=True, history=True):
+        self.center = center
+        self.use_pv = pv
+        self.use_killers = killers
+        self.use_history = history
+
+        self.root_depth = 0
+        self.pv = {}
+        self.killers = {}
+        self.history = {1: [0] * COLS, -1: [0] * COLS}
+
+    def start(self, depth):
+        """
+        Called once per (iteration of a) search with the root depth, so the
+        ply of a node is root_depth - depth.  Killers are per ply and are
+        reset; the PV moves and the history table carry over.
+        """
+        self.root_depth = depth
+        self.killers = {}
+
+    def order(self, state, actions, depth, hash_move=None):
+        ply = self.root_depth - depth
+
+        if self.center:
+            actions = sorted(actions, key=CENTER_RANK.__getitem__)
+        if self.use_history:
+            scores = self.history[state.player]
+            actions = sorted(actions, key=lambda c: -scores[c])
+
+        first = []
+        if self.use_pv:
+            if hash_move is None:
+                hash_move = self.pv.get(state.key)
+            if hash_move is not None:
+                first.append(hash_move)
+        if self.use_killers:
+            first += [c for c in self.killers.get(ply, ()) if c not in first]
+
+        if not first:
+            return actions
+        first = [c for c in first if c in actions]
+        return first + [c for c in actions if c not in first]
+
+    def cutoff(self, state, action, depth):
+        ply = self.root_depth - depth
+        if self.use_killers:
+            killers = self.killers.setdefault(ply, [])
+            if action not in killers:
+                killers.insert(0, action)
+                del killers[2:]
+        if self.use_history:
+            self.history[state.player][action] += depth * depth
+
+    def best(self, state, action, depth):
+        # Only interior nodes a few plies above the horizon are remembered,
+        # which keeps the PV map far smaller than the tree.
+        if self.use_pv and action is not None and depth >= 2:
+            self.pv[state.key] = action
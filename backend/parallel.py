@@ -0,0 +1,189 @@
+import os
+import threading
+import multiprocessing
+from multiprocessing import resource_tracker
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from ordering import CENTER_RANK, MoveOrderer
+from context import SearchContext
+from search_control import SearchAborted, SharedFlag
+from stats import SearchStats, evaluate
+from transposition import TranspositionTable
+import minimax
+import alpha_beta
+
+INF = 1e18
+
+# How often (seconds) a waiting parallel search checks its stop condition
+POLL_INTERVAL = 0.05
+
+WORKERS = int(os.environ.get('C4_WORKERS', 0)) or os.cpu_count() or 1
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool_context():
+    """
+    The multiprocessing context every process pool is created with.  The
+    server forks from request, job and ponder threads that may hold locks,
+    and a forked worker would inherit them held, so workers start from a
+    forkserver (spawn where there is none) and import their entry points
+    by module name.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+def get_pool():
+    """
+    The process pool shared by every parallel search, created on first use
+    and kept for the life of the server.  Size comes from C4_WORKERS, or the
+    number of cores.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Workers started after the resource tracker share it, so shared
+            # memory they attach to (lazy_smp) is only freed by its creator
+            resource_tracker.ensure_running()
+            _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=pool_context())
+        return _pool
+
+
+def _search_root_move(board, action, alpha, use_alpha_beta, ctx, use_table, use_ordering, use_stats):
+    """
+    Worker side: search the subtree under one root move and return
+    (action, value, expanded, child_state, stats).  ctx carries the depth,
+    the settings and the search's SharedFlag as its stop; the worker makes
+    its own table, orderer and stats as asked.  The child is detached from
+    its parent so only the subtree is sent back.
+    """
+    ctx = ctx.derive(
+        table=TranspositionTable() if use_table else None,
+        orderer=MoveOrderer() if use_ordering else None,
+        stats=SearchStats() if use_stats else None,
+    )
+    if ctx.orderer is not None:
+        ctx.orderer.start(ctx.depth)
+    if ctx.stats is not None:
+        ctx.stats.start(ctx.depth)
+
+    root = ctx.root(board, -INF, INF)
+    child = root.transition(action, alpha, INF)
+    try:
+        if use_alpha_beta:
+            value, _, expanded = alpha_beta.min_value(child, ctx.depth-1, alpha, INF, ctx)
+        else:
+            value, _, expanded = minimax.min_value(child, ctx.depth-1, ctx)
+    finally:
+        ctx.stop.close()
+
+    child.parent = None
+    return action, value, expanded, child, ctx.stats
+
+
+def parallel_minimax(board, ctx: SearchContext = None, use_alpha_beta = True):
+    """
+    Root-parallel minimax / alpha-beta over the shared process pool.  Same
+    (value, action, root_state, expanded) contract as minimax.minimax() and
+    alpha_beta.minimax().
+
+    Every worker keeps its own transposition table and move orderer when
+    ctx has a table / orderer (ctx's own are not used).
+
+    For alpha-beta the first (centre-most) root move is searched alone to
+    get a bound; the remaining moves are then handed out as workers become
+    free, each with the best value found so far as its alpha.
+
+    ctx.stop / ctx.deadline are checked while waiting on the workers; when
+    one fires the queued root moves are cancelled, a SharedFlag shared with
+    the workers stops the running ones, and SearchAborted is raised.  The
+    workers' stats are merged into ctx.stats, if given.
+    """
+    if ctx is None:
+        ctx = SearchContext()
+    depth, keep_tree, stats = ctx.depth, ctx.keep_tree, ctx.stats
+    root = ctx.root(board, -INF, INF)
+    if stats is not None:
+        stats.start(depth)
+        stats.node(depth)
+    if root.is_terminal() or depth == 0:
+        return evaluate(root, stats), None, root, 1
+
+    # A symmetric root only needs one of each mirrored pair of moves
+    actions = sorted(root.distinct_actions(), key=CENTER_RANK.__getitem__)
+    pool = get_pool()
+
+    results = {}
+    alpha = -INF
+
+    # Only the settings and a flag this process sets on abort travel to the
+    # workers: other stop conditions can not be pickled, and every worker
+    # makes its own table / orderer / stats
+    flag = SharedFlag()
+    worker_ctx = ctx.derive(table=None, orderer=None, stats=None, stop=flag, deadline=None)
+
+    def submit(action):
+        return pool.submit(_search_root_move, board, action, alpha, use_alpha_beta, worker_ctx,
+                           ctx.table is not None, ctx.orderer is not None, stats is not None)
+
+    def wait_any(futures):
+        while True:
+            done, futures = wait(futures, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            if ctx.halt is not None and ctx.halt.expired():
+                flag.set()
+                for future in futures:
+                    future.cancel()
+                raise SearchAborted()
+            if done:
+                return done, futures
+
+    try:
+        if use_alpha_beta:
+            done, _ = wait_any({submit(actions[0])})
+            action, value, expanded, child, worker_stats = done.pop().result()
+            results[action] = value, expanded, child, worker_stats
+            alpha = value
+            pending_actions = actions[1:]
+            max_running = WORKERS
+        else:
+            pending_actions = list(actions)
+            max_running = len(actions)
+
+        running = set()
+        while pending_actions or running:
+            while pending_actions and len(running) < max_running:
+                running.add(submit(pending_actions.pop(0)))
+            done, running = wait_any(running)
+            for future in done:
+                action, value, expanded, child, worker_stats = future.result()
+                results[action] = value, expanded, child, worker_stats
+                alpha = max(alpha, value)
+    finally:
+        # Workers still to unpickle the flag find it gone and stop at once
+        flag.set()
+        flag.close()
+        flag.unlink()
+
+    rv = -INF
+    best_action = None
+    expanded = 0
+    for action in actions:
+        value, ex, child, worker_stats = results[action]
+        expanded += ex
+        if stats is not None:
+            stats.merge(worker_stats)
+        if keep_tree:
+            child.parent = root
+            root.children.append(child)
+        if rv < value:
+            rv, best_action = value, action
+
+    if stats is not None:
+        stats.interior += 1
+        stats.children += len(actions)
+
+    root.value = rv
+    return rv, best_action, root, expanded
@@ -0,0 +1,226 @@
+import threading
+from collections import OrderedDict
+
+from state import Connect4State
+from ordering import MoveOrderer
+from search_control import CancelToken, SearchAborted
+from context import SearchContext
+from transposition import TranspositionTable
+import alpha_beta
+
+
+def board_key(board):
+    return tuple(tuple(row) for row in board)
+
+
+class Ponderer:
+    """
+    Searches the human's likely replies on a background thread while the
+    server waits for the next move.
+
+    start() is called right after the AI has moved.  For each human reply,
+    most promising for the human first, it runs alpha_beta on the resulting
+    board and stashes {options, value, action, expanded, tree} by that board.
+    options is the caller's description of the search (the server's cache
+    key options), and take() only hands out results searched with the same.
+
+    When the human's real move arrives, resolve() cancels the work on every
+    other reply; a search already running on the real reply finishes.  The
+    following AI request collects the result with take().
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+        self.token = None
+        self.current = None
+        self.stop_after_current = False
+        self.results = {}
+
+        self.started = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.hits = 0
+        self.misses = 0
+
+    def start(self, board, k, options, state_cls = Connect4State, include_tree = True, serialize = None,
+              table = None, ordering = False):
+        """
+        Ponder the replies to board (human to move), replacing any pondering
+        in progress.  serialize turns a searched root state into the stored
+        tree text.  Each reply gets a fresh TranspositionTable(*table) when
+        table is a (size, policy) pair, and a MoveOrderer when ordering is
+        set.
+        """
+        with self.lock:
+            old_thread = self._stop()
+            self.results = {}
+            self.token = CancelToken()
+            self.current = None
+            self.stop_after_current = False
+            self.thread = threading.Thread(
+                target=self._run,
+                args=(board, k, options, state_cls, include_tree, serialize, table, ordering, self.token),
+                daemon=True)
+            self.started += 1
+            self.thread.start()
+        if old_thread is not None:
+            old_thread.join()
+
+    def _run(self, board, k, options, state_cls, include_tree, serialize, table, ordering, token):
+        human = state_cls(board, -1, None, None)
+        if human.is_terminal():
+            return
+
+        # The human (MIN) most likely plays the reply that looks worst for us
+        replies = sorted(human.neighbors(), key=lambda child: child.heuristic())
+
+        # token is cancelled under the lock when this run is replaced or
+        # abandoned, so a run that still holds an unexpired token under the
+        # lock is the current one and may touch the shared fields
+        for reply in replies:
+            reply_board = reply.board
+            key = board_key(reply_board)
+            with self.lock:
+                if token.expired() or self.stop_after_current:
+                    return
+                self.current = key
+
+            try:
+                ctx = SearchContext(k, state_cls, include_tree,
+                                    TranspositionTable(*table) if table is not None else None,
+                                    MoveOrderer() if ordering else None, stop=token)
+                value, action, root_state, expanded = alpha_beta.minimax(reply_board, ctx)
+            except SearchAborted:
+                with self.lock:
+                    if token is self.token:
+                        self.current = None
+                return
+
+            tree = serialize(root_state) if include_tree and serialize is not None else None
+            with self.lock:
+                if token.expired():
+                    return
+                self.results[key] = {'options': options, 'value': value, 'action': action,
+                                     'expanded': expanded, 'tree': tree}
+                self.completed += 1
+                self.current = None
+
+    def _stop(self):
+        """
+        Cancel the running pondering, with the lock held, and return its
+        thread for the caller to join once the lock is released.
+        """
+        thread = self.thread
+        if self.token is not None and not self.token.expired():
+            self.token.cancel()
+            if thread is not None and thread.is_alive():
+                self.cancelled += 1
+        self.current = None
+        return thread
+
+    def cancel(self):
+        """Abandon all pondering, keeping nothing still in progress."""
+        with self.lock:
+            thread = self._stop()
+        if thread is not None:
+            thread.join()
+
+    def resolve(self, board):
+        """
+        The human played into board: drop every other reply, let a search
+        already running on board finish, and stop pondering after it.
+        """
+        key = board_key(board)
+        with self.lock:
+            self.results = {key: self.results[key]} if key in self.results else {}
+            if self.current == key:
+                self.stop_after_current = True
+                return
+        self.cancel()
+
+    def take(self, board, options, need_tree = False):
+        """
+        The pondered result for board searched with options, or None.  Waits
+        for a search running on board, and stops pondering after it even
+        when resolve() was not called.
+        """
+        key = board_key(board)
+        with self.lock:
+            thread = None
+            if self.current == key:
+                self.stop_after_current = True
+                thread = self.thread
+        if thread is not None:
+            thread.join()
+
+        with self.lock:
+            result = self.results.pop(key, None)
+            if result is None or result['options'] != options or (need_tree and result['tree'] is None):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return result
+
+    def stats(self):
+        with self.lock:
+            return {
+                'started': self.started,
+                'completed': self.completed,
+                'cancelled': self.cancelled,
+                'hits': self.hits,
+                'misses': self.misses,
+                'pending': len(self.results),
+            }
+
+
+class PonderRegistry:
+    """
+    One Ponderer per game, so a move in one game never cancels the
+    pondering of another.  Games are named by the caller (the server's
+    'gameId'); past max_games the least recently used game's pondering is
+    cancelled and forgotten.
+    """
+
+    def __init__(self, max_games=64):
+        self.max_games = max_games
+        self.lock = threading.Lock()
+        self.games = OrderedDict()
+        # Counters of the ponderers already forgotten
+        self.retired = {'started': 0, 'completed': 0, 'cancelled': 0, 'hits': 0, 'misses': 0}
+
+    def get(self, game):
+        """The Ponderer of game, created on first use"""
+        evicted = []
+        with self.lock:
+            ponderer = self.games.get(game)
+            if ponderer is None:
+                ponderer = self.games[game] = Ponderer()
+            self.games.move_to_end(game)
+            while len(self.games) > self.max_games:
+                evicted.append(self.games.popitem(last=False)[1])
+        for old in evicted:
+            old.cancel()
+            with self.lock:
+                for name, count in old.stats().items():
+                    if name in self.retired:
+                        self.retired[name] += count
+        return ponderer
+
+    def find(self, game):
+        """The Ponderer of game, or None when it has never pondered"""
+        with self.lock:
+            ponderer = self.games.get(game)
+            if ponderer is not None:
+                self.games.move_to_end(game)
+            return ponderer
+
+    def stats(self):
+        with self.lock:
+            ponderers = list(self.games.values())
+            totals = dict(self.retired, pending=0)
+        for ponderer in ponderers:
+            for name, count in ponderer.stats().items():
+                totals[name] += count
+        totals['games'] = len(ponderers)
+        return totals
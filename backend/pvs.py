@@ -0,0 +1,219 @@
+"""
+Principal Variation Search (NegaScout) with aspiration windows
+
+A negamax formulation of alpha_beta: every node maximizes its own score,
+player * value.  The first (best ordered) move of a node is searched with
+the full window; every later move only has to prove it is no better, so it
+is searched with a null window (alpha, alpha + 1), which cuts far more.  A
+move that fails high on the null window is re-searched with the full one.
+Values are integers, so the null window is exact.
+
+search() deepens from depth 1 to ctx.depth.  Every iteration after the
+first starts with an aspiration window of +-ctx.option('aspiration')
+around the previous score and widens it (doubling) on a fail low / high,
+so the returned value is always the exact minimax value alpha_beta gives.
+Without a move orderer in ctx a default MoveOrderer is used, since PVS
+only pays off when the first move is usually the best.
+"""
+
+import time
+
+from state import Connect4State, mirror_move
+from transposition import EXACT, LOWER, UPPER
+from ordering import MoveOrderer
+from context import SearchContext
+from search_control import SearchAborted
+from stats import evaluate
+
+INF = 1e18
+
+# Default half-width of the aspiration window
+ASPIRATION = 50
+
+
+def minimax(board, ctx: SearchContext = None):
+    value, action, state, expanded, _ = search(board, ctx)
+    return value, action, state, expanded
+
+
+def search(board, ctx: SearchContext = None):
+    """
+    Iterative deepening PVS.  Returns (value, action, root_state, expanded,
+    iterations) like iterative.iterative_deepening(): expanded is the total
+    over the completed iterations and iterations holds one {depth, timeMs,
+    expanded, value, move, researches} dict each.  When ctx.deadline passes
+    the deepest completed iteration is returned (depth 1 always completes);
+    when ctx.stop fires SearchAborted is raised.
+    """
+    if ctx is None:
+        ctx = SearchContext()
+    orderer = ctx.orderer if ctx.orderer is not None else MoveOrderer()
+    delta = ctx.option('aspiration', ASPIRATION)
+
+    empty = sum(row.count(0) for row in board)
+    max_depth = max(1, min(ctx.depth, empty))
+
+    result = None
+    expanded = 0
+    iterations = []
+
+    for depth in range(1, max_depth + 1):
+        iteration = ctx.derive(depth=depth, orderer=orderer, deadline=ctx.deadline if result is not None else None)
+        start = time.perf_counter()
+        try:
+            if result is None:
+                window = -INF, INF
+            else:
+                window = result[0] - delta, result[0] + delta
+            value, action, state, ex, researches = _aspiration(board, iteration, window, delta)
+        except SearchAborted:
+            if ctx.stop is not None and ctx.stop.expired():
+                raise
+            break
+
+        expanded += ex
+        iterations.append({
+            'depth': depth,
+            'timeMs': round((time.perf_counter() - start) * 1000, 3),
+            'expanded': ex,
+            'value': value,
+            'move': action,
+            'researches': researches,
+        })
+        result = value, action, state
+        if action is not None:
+            orderer.pv[state.key] = action
+
+    value, action, state = result
+    return value, action, state, expanded, iterations
+
+
+def _aspiration(board, ctx, window, delta):
+    """
+    One iteration at ctx.depth, searched inside window and widened until
+    the root value falls strictly inside it.  Returns (value, action,
+    root_state, expanded, researches).
+    """
+    alpha, beta = window
+    expanded = 0
+    researches = 0
+    while True:
+        state = ctx.root(board, alpha, beta)
+        ctx.orderer.start(ctx.depth)
+        if ctx.stats is not None:
+            ctx.stats.start(ctx.depth)
+        score, action, ex = _search(state, ctx.depth, alpha, beta, ctx)
+        expanded += ex
+
+        if score <= alpha and alpha > -INF:
+            alpha = max(-INF, score - delta)
+        elif score >= beta and beta < INF:
+            beta = min(INF, score + delta)
+        else:
+            return score, action, state, expanded, researches
+        delta *= 2
+        researches += 1
+
+
+def _probe(state, depth, alpha, beta, table):
+    """
+    alpha_beta._probe() for a negamax node: the table holds AI (MAX)
+    values, and (alpha, beta) and the result are in the node's perspective.
+    """
+    key, mirrored = state.canonical_key()
+    entry = table.probe(key)
+    if entry is None:
+        return None, None
+
+    _, stored_depth, value, flag, move = entry
+    if mirrored and move is not None:
+        move = mirror_move(move)
+    if state.player == -1:
+        value = -value
+        flag = {EXACT: EXACT, LOWER: UPPER, UPPER: LOWER}[flag]
+    if stored_depth >= depth and (flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha)):
+        return value, move
+    return None, move
+
+
+def _store(state, depth, alpha, beta, table, score, action):
+    if score <= alpha:
+        flag = UPPER
+    elif score >= beta:
+        flag = LOWER
+    else:
+        flag = EXACT
+    if state.player == -1:
+        score = -score
+        flag = {EXACT: EXACT, LOWER: UPPER, UPPER: LOWER}[flag]
+    key, mirrored = state.canonical_key()
+    if mirrored and action is not None:
+        action = mirror_move(action)
+    table.store(key, depth, score, flag, action)
+
+
+def _search(state: Connect4State, depth, alpha, beta, ctx: SearchContext):
+    """
+    Fail-soft PVS.  Returns (score, action, expanded) with score in the
+    perspective of the player to move; state.value is set in the AI's.
+    """
+    ctx.check()
+    table, orderer, stats = ctx.table, ctx.orderer, ctx.stats
+    if stats is not None:
+        stats.node(depth)
+    sign = state.player
+    if (state.is_terminal() or depth == 0):
+        return sign * evaluate(state, stats), None, 1
+
+    hash_move = None
+    if table is not None:
+        v, hash_move = _probe(state, depth, alpha, beta, table)
+        if v is not None:
+            state.value = sign * v
+            return v, hash_move, 1
+        alpha0, beta0 = alpha, beta
+
+    # The root of a symmetric position only needs one of each mirrored pair
+    actions = state.distinct_actions() if state.parent is None else state.available_actions()
+    actions = orderer.order(state, actions, depth, hash_move)
+
+    best = -INF
+    best_action = None
+    expanded = 0
+
+    for i, c in enumerate(actions):
+        # Children keep the window in the AI's perspective, as alpha_beta's do
+        child = state.transition(c, *((alpha, beta) if sign == 1 else (-beta, -alpha)))
+        if i == 0:
+            v, _, ex = _search(child, depth-1, -beta, -alpha, ctx)
+            v = -v
+        else:
+            v, _, ex = _search(child, depth-1, -alpha-1, -alpha, ctx)
+            v = -v
+            if alpha < v < beta:
+                # Failed high on the null window: the move may be the new best
+                expanded += ex
+                child.children = []
+                v, _, ex = _search(child, depth-1, -beta, -alpha, ctx)
+                v = -v
+        expanded += ex
+
+        if best < v:
+            best, best_action = v, c
+            alpha = max(alpha, best)
+
+        if (alpha >= beta):
+            if stats is not None:
+                stats.cutoffs += 1
+            orderer.cutoff(state, c, depth)
+            break
+
+    if table is not None:
+        _store(state, depth, alpha0, beta0, table, best, best_action)
+    orderer.best(state, best_action, depth)
+
+    state.value = sign * best
+    if stats is not None:
+        stats.leave(state)
+    state.drop_children()
+    return best, best_action, expanded
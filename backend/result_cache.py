@@ -0,0 +1,138 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from state import mirror_board, mirror_move
+
+# Rough per-entry cost of the key, the result dict and the OrderedDict slot
+ENTRY_OVERHEAD = 512
+
+
+def canonical_board_key(board):
+    """
+    Hashable key shared by a board and its mirror image, and whether the
+    board is the mirrored one.  Results are stored in the orientation of the
+    key; mirror_result() turns them around for a mirrored board.
+    """
+    key = tuple(tuple(row) for row in board)
+    mirror = tuple(tuple(row) for row in mirror_board(board))
+    if mirror < key:
+        return mirror, True
+    return key, False
+
+
+def _mirror_tree(node):
+    """Mirror a tree JSON node in place: moves, and children left to right"""
+    if node.get('move') is not None:
+        node['move'] = mirror_move(node['move'])
+    if node.get('children'):
+        node['children'] = node['children'][::-1]
+        for child in node['children']:
+            _mirror_tree(child)
+
+
+def mirror_result(result):
+    """The result dict for the mirror image of the searched board"""
+    mirrored = dict(result)
+    if result['action'] is not None:
+        mirrored['action'] = mirror_move(result['action'])
+    if result.get('iterations') is not None:
+        mirrored['iterations'] = [
+            dict(it, move=mirror_move(it['move'])) if it['move'] is not None else it
+            for it in result['iterations']]
+    if result['tree'] is not None:
+        tree = json.loads(result['tree'])
+        if tree is not None:
+            _mirror_tree(tree)
+        mirrored['tree'] = json.dumps(tree)
+    return mirrored
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of finished searches, shared by all requests.
+
+    Entries are result dicts ({value, action, expanded, tree, iterations?})
+    where tree is the serialized tree JSON text, or None when the search ran
+    without one, and iterations the per-depth log of an iterative search.
+    Callers key boards with canonical_board_key() so a board and its mirror
+    image share one entry.
+    The cache is bounded by entry count and by approximate bytes (mostly the
+    tree text), and entries expire ttl seconds after they were stored.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _size(result):
+        return ENTRY_OVERHEAD + len(result['tree'] or '')
+
+    def _remove(self, key):
+        _, result = self.entries.pop(key)
+        self.bytes -= self._size(result)
+
+    def get(self, key, need_tree=False):
+        """
+        The cached result for key, or None.  With need_tree, an entry stored
+        without a tree counts as a miss.
+        """
+        with self.lock:
+            item = self.entries.get(key)
+            if item is not None and time.monotonic() - item[0] > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                item = None
+            if item is None or (need_tree and item[1]['tree'] is None):
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key, result):
+        size = self._size(result)
+        if size > self.max_bytes:
+            return
+
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (time.monotonic(), result)
+            self.bytes += size
+
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.bytes,
+                'maxEntries': self.max_entries,
+                'maxBytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
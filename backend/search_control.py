@@ -0,0 +1,81 @@
+import threading
+import time
+from multiprocessing.shared_memory import SharedMemory
+
+
+class SearchAborted(Exception):
+    """Raised inside a search when its stop condition fires."""
+
+
+class Deadline:
+    """
+    Stop condition for a time-budgeted search.  The engines call expired()
+    at every node and raise SearchAborted once it returns True.
+    """
+
+    def __init__(self, time_ms):
+        self.end = time.perf_counter() + time_ms / 1000
+
+    def expired(self):
+        return time.perf_counter() >= self.end
+
+
+class CancelToken:
+    """
+    Stop condition that fires when another thread calls cancel(), for
+    searches that must be abandoned rather than timed out.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+
+    def cancel(self):
+        self.event.set()
+
+    def expired(self):
+        return self.event.is_set()
+
+
+class AnyOf:
+    """Stop condition that fires as soon as any of its conditions does."""
+
+    def __init__(self, *conditions):
+        self.conditions = [c for c in conditions if c is not None]
+
+    def expired(self):
+        return any(c.expired() for c in self.conditions)
+
+
+class SharedFlag:
+    """
+    Stop condition that fires in every process once set() is called in
+    any, for searches spread over the process pool.  The creating process
+    owns the memory and must unlink() it.  Pickling sends only the name; a
+    flag unpickled after its memory is gone counts as expired.
+    """
+
+    def __init__(self, name=None):
+        self.shm = SharedMemory(create=True, size=1) if name is None else SharedMemory(name=name)
+
+    def __getstate__(self):
+        return self.shm.name
+
+    def __setstate__(self, name):
+        try:
+            self.__init__(name=name)
+        except FileNotFoundError:
+            self.shm = None
+
+    def set(self):
+        if self.shm is not None:
+            self.shm.buf[0] = 1
+
+    def expired(self):
+        return self.shm is None or self.shm.buf[0] != 0
+
+    def close(self):
+        if self.shm is not None:
+            self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
@@ -0,0 +1,161 @@
+"""
+Non-recursive make / unmake alpha-beta
+
+The same search as alpha_beta.minimax() without a transposition table or
+move ordering, but on one mutable position: two piece masks and a column
+height array (the bitboard layout) that every move is made on and unmade
+from, instead of a new state per node.  The recursion is replaced by an
+explicit stack of per-ply arrays allocated once per search, so a node costs
+no allocation and no Python frame, and k is not limited by the recursion
+limit.  The count_windows() tally is kept up to date on every move (as in
+IncrementalBitboardState), so a leaf is scored in O(1).
+
+Moves are tried in the order alpha_beta tries them (columns left to right,
+only one of each mirrored pair at a symmetric root) and cutoffs happen at
+the same nodes, so value, action and expanded are identical to
+alpha_beta.minimax()'s.  No tree is built: the returned root state has no
+children whatever ctx.keep_tree says, and ctx.table / ctx.orderer are not
+used.
+"""
+
+import time
+
+from state import ROWS, COLS
+from bitboard import H, TOP_MASK, board_to_masks, count_windows, score_counts, update_tally
+from context import SearchContext
+
+INF = 1e18
+
+
+def minimax(board, ctx: SearchContext = None):
+    if ctx is None:
+        ctx = SearchContext()
+    root = ctx.root(board, -INF, INF)
+    if ctx.stats is not None:
+        ctx.stats.start(ctx.depth)
+    value, action, expanded = search(board_to_masks(board), ctx.depth, root.distinct_actions(), ctx)
+    root.value = value
+    return value, action, root, expanded
+
+
+def _evaluate(tally, stats):
+    if stats is None:
+        return score_counts(tally)
+    start = time.perf_counter()
+    value = score_counts(tally)
+    stats.heuristic_time += time.perf_counter() - start
+    stats.heuristic_calls += 1
+    return value
+
+
+def search(masks, depth, root_moves, ctx: SearchContext):
+    """
+    Alpha-beta from the position (ai, human, heights) = masks, AI to move,
+    trying root_moves at the root.  Returns (value, action, expanded).
+
+    Ply p of the stack is the node p moves below the root; even plies are
+    AI (MAX) nodes.  played[p] is the move made from ply p to reach ply
+    p + 1, nxt[p] the next column to try there and saved[p] the tally
+    before that move.
+    """
+    ai, human, heights = masks
+    heights = list(heights)
+    tally = list(count_windows(ai, human))
+    stats = ctx.stats
+
+    ctx.check()
+    if stats is not None:
+        stats.node(depth)
+    if depth == 0 or (ai | human) & TOP_MASK == TOP_MASK:
+        return _evaluate(tally, stats), None, 1
+
+    size = depth + 1
+    alpha = [-INF] * size
+    beta = [INF] * size
+    best = [-INF] * size
+    best_move = [None] * size
+    expanded = [0] * size
+    searched = [0] * size
+    nxt = [0] * size
+    played = [0] * size
+    saved = [[0] * len(tally) for _ in range(size)]
+
+    ply = 0
+    while True:
+        # Next move at this ply, or None when the node is finished
+        c = None
+        if alpha[ply] < beta[ply]:
+            if ply == 0:
+                if nxt[0] < len(root_moves):
+                    c = root_moves[nxt[0]]
+                    nxt[0] += 1
+            else:
+                c = nxt[ply]
+                while c < COLS and heights[c] >= ROWS:
+                    c += 1
+                if c < COLS:
+                    nxt[ply] = c + 1
+                else:
+                    c = None
+
+        if c is not None:
+            # Make the move
+            bit = 1 << (c * H + heights[c])
+            heights[c] += 1
+            saved[ply][:] = tally
+            if ply & 1:
+                update_tally(tally, ai, human, ai, human | bit)
+                human |= bit
+            else:
+                update_tally(tally, ai, human, ai | bit, human)
+                ai |= bit
+            played[ply] = c
+            searched[ply] += 1
+
+            ctx.check()
+            child_depth = depth - ply - 1
+            if stats is not None:
+                stats.node(child_depth)
+            if child_depth > 0 and (ai | human) & TOP_MASK != TOP_MASK:
+                ply += 1
+                alpha[ply] = alpha[ply - 1]
+                beta[ply] = beta[ply - 1]
+                best[ply] = INF if ply & 1 else -INF
+                best_move[ply] = None
+                expanded[ply] = 0
+                searched[ply] = 0
+                nxt[ply] = 0
+                continue
+            v = _evaluate(tally, stats)
+            ex = 1
+        else:
+            # The node is finished: pop it and hand its value to its parent
+            if stats is not None:
+                stats.exit(searched[ply])
+            if ply == 0:
+                return best[0], best_move[0], expanded[0]
+            v = best[ply]
+            ex = expanded[ply]
+            ply -= 1
+            c = played[ply]
+
+        # Unmake the move played at this ply and back its value up
+        heights[c] -= 1
+        bit = 1 << (c * H + heights[c])
+        if ply & 1:
+            human ^= bit
+        else:
+            ai ^= bit
+        tally[:] = saved[ply]
+
+        expanded[ply] += ex
+        if ply & 1:
+            if best[ply] > v:
+                best[ply], best_move[ply] = v, c
+                beta[ply] = min(beta[ply], v)
+        elif best[ply] < v:
+            best[ply], best_move[ply] = v, c
+            alpha[ply] = max(alpha[ply], v)
+
+        if alpha[ply] >= beta[ply] and stats is not None:
+            stats.cutoffs += 1
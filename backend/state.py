@@ -1,15 +1,63 @@
+import random
+
 ROWS = 6
 COLS = 7
 INF = 1e18
 
+# Zobrist keys: one random 64-bit number per (row, col, piece), plus one that
+# is xor-ed in when the human (MIN) is to move.  Seeded so hashes are stable
+# across processes and runs.
+_zobrist_rng = random.Random(0xC0FFEE)
+ZOBRIST = [[{1: _zobrist_rng.getrandbits(64), -1: _zobrist_rng.getrandbits(64)} for _ in range(COLS)]
+           for _ in range(ROWS)]
+SIDE_KEY = _zobrist_rng.getrandbits(64)
+
+
+def board_hash(board, player):
+    key = SIDE_KEY if player == -1 else 0
+    for r in range(ROWS):
+        for c in range(COLS):
+            if board[r][c] != 0:
+                key ^= ZOBRIST[r][c][board[r][c]]
+    return key
+
+
+def mirror_move(col):
+    """The column col becomes when the board is mirrored left-right"""
+    return COLS - 1 - col
+
+
+def mirror_board(board):
+    return [row[::-1] for row in board]
+
+
+def mirror_hash(board, player):
+    """board_hash() of the left-right mirror image of board"""
+    return board_hash(mirror_board(board), player)
+
+
+def canonical_hash(board, player):
+    """
+    Key shared by a board and its mirror image: the smaller of the two
+    hashes.  Returns (key, mirrored) where mirrored says the key is the
+    mirror image's, so moves stored under it map back through mirror_move().
+    """
+    key, mirror = board_hash(board, player), mirror_hash(board, player)
+    if mirror < key:
+        return mirror, True
+    return key, False
+
+
 class Connect4State:
-    def __init__(self, board=None, player=1, action=None, parent=None, alpha = None, beta = None):
+    def __init__(self, board=None, player=1, action=None, parent=None, alpha = None, beta = None, key = None, mirror_key = None):
         if board is None:
             self.board = [[0] * COLS for _ in range(ROWS)]
         else:
             self.board = [row.copy() for row in board]
 
         self.player = player
+        self.key = key if key is not None else board_hash(self.board, player)
+        self.mirror_key = mirror_key if mirror_key is not None else mirror_hash(self.board, player)
         self.action = action
         self.parent = parent
 
@@ -18,9 +66,11 @@ class Connect4State:
         self.value = None
         self.expected_value = None
         self.children = []
+        self.keep_tree = True
 
     def copy(self):
-        return Connect4State(board=self.board, player=self.player, action=self.action, parent=self.parent)
+        return Connect4State(board=self.board, player=self.player, action=self.action, parent=self.parent, key=self.key,
+                             mirror_key=self.mirror_key)
 
     def available_actions(self):
         return [c for c in range(COLS) if self.board[ROWS - 1][c] == 0]
@@ -31,18 +81,62 @@ class Connect4State:
                 return r
         raise IndexError("Column full")
 
+    def _child_key(self, r, col):
+        return self.key ^ ZOBRIST[r][col][self.player] ^ SIDE_KEY
+
+    def _child_mirror_key(self, r, col):
+        return self.mirror_key ^ ZOBRIST[r][mirror_move(col)][self.player] ^ SIDE_KEY
+
+    def canonical_key(self):
+        """
+        (key, mirrored) as canonical_hash() returns it, from the keys kept
+        up to date by transition()
+        """
+        if self.mirror_key < self.key:
+            return self.mirror_key, True
+        return self.key, False
+
+    def is_symmetric(self):
+        """True when the board is its own mirror image"""
+        return self.key == self.mirror_key
+
+    def distinct_actions(self):
+        """
+        available_actions() without the mirror images of other moves when
+        the board is symmetric: those lead to mirrored, equal-valued positions
+        """
+        actions = self.available_actions()
+        if self.is_symmetric():
+            actions = [c for c in actions if c <= mirror_move(c)]
+        return actions
+
     def transition(self, action, alpha = None, beta = None):
         r = self._next_open_row(action)
-        child = Connect4State(self.board, -self.player, action, self, alpha, beta)
+        child = Connect4State(self.board, -self.player, action, self, alpha, beta, self._child_key(r, action),
+                              self._child_mirror_key(r, action))
         child.board[r][action] = self.player
-        self.children.append(child)
+        self._adopt(child)
         return child
 
+    def _adopt(self, child):
+        child.keep_tree = self.keep_tree
+        self.children.append(child)
+
+    def drop_children(self):
+        """
+        Called by the searches once a node's value is final.  In tree-free
+        mode (keep_tree False) the children are forgotten, so only the nodes
+        on the current search path stay alive.
+        """
+        if not self.keep_tree:
+            self.children = []
+
     def neighbors(self):
         children = []
         for c in self.available_actions():
             r = self._next_open_row(c)
-            child = Connect4State(board=self.board, player=-self.player, action=c, parent=self)
+            child = Connect4State(board=self.board, player=-self.player, action=c, parent=self, key=self._child_key(r, c),
+                                  mirror_key=self._child_mirror_key(r, c))
             child.board[r][c] = self.player
             children.append(child)
         return children
@@ -0,0 +1,101 @@
+import time
+
+
+class SearchStats:
+    """
+    Counters for one search, filled in by the engines when passed one.
+
+        nodes           nodes visited per ply (ply 0 is the root)
+        cutoffs         alpha-beta cutoffs
+        heuristic_*     leaf evaluations and the time spent in heuristic()
+        interior        nodes whose children were searched, and children
+                        the total number of children they searched
+        peak_tree_size  most nodes held in memory at once; with keep_tree
+                        that is the whole tree, without it roughly the
+                        current path plus the siblings on it
+
+    The ply of a node is root_depth - depth, so every (iteration of a)
+    search calls start() with its root depth first.
+    """
+
+    def __init__(self):
+        self.root_depth = 0
+        self.nodes = []
+        self.cutoffs = 0
+        self.heuristic_calls = 0
+        self.heuristic_time = 0.0
+        self.interior = 0
+        self.children = 0
+        self.live = 0
+        self.peak_tree_size = 0
+
+    def start(self, depth):
+        self.root_depth = depth
+        self.live = 0
+
+    def node(self, depth):
+        """Count a node on entry"""
+        ply = self.root_depth - depth
+        while len(self.nodes) <= ply:
+            self.nodes.append(0)
+        self.nodes[ply] += 1
+        self.live += 1
+        if self.live > self.peak_tree_size:
+            self.peak_tree_size = self.live
+
+    def evaluate(self, state):
+        """state.heuristic(), counted and timed"""
+        start = time.perf_counter()
+        value = state.heuristic()
+        self.heuristic_time += time.perf_counter() - start
+        self.heuristic_calls += 1
+        return value
+
+    def leave(self, state):
+        """Count an interior node on exit, before its children are dropped"""
+        self.exit(len(state.children), state.keep_tree)
+
+    def exit(self, children, keep_tree=False):
+        """leave() for a node that is only known by its number of children"""
+        self.interior += 1
+        self.children += children
+        if not keep_tree:
+            self.live -= children
+
+    def merge(self, other):
+        """
+        Add in the stats of a subtree searched elsewhere (a parallel
+        worker).  The subtrees live side by side, so their peaks add up.
+        """
+        for ply, count in enumerate(other.nodes):
+            while len(self.nodes) <= ply:
+                self.nodes.append(0)
+            self.nodes[ply] += count
+        self.cutoffs += other.cutoffs
+        self.heuristic_calls += other.heuristic_calls
+        self.heuristic_time += other.heuristic_time
+        self.interior += other.interior
+        self.children += other.children
+        self.peak_tree_size += other.peak_tree_size
+
+    def branching_factor(self):
+        """Average number of children searched per interior node"""
+        return self.children / self.interior if self.interior else 0.0
+
+    def to_dict(self):
+        return {
+            'nodes': sum(self.nodes),
+            'nodesByDepth': list(self.nodes),
+            'cutoffs': self.cutoffs,
+            'heuristicCalls': self.heuristic_calls,
+            'heuristicTimeMs': round(self.heuristic_time * 1000, 3),
+            'branchingFactor': round(self.branching_factor(), 3),
+            'peakTreeSize': self.peak_tree_size,
+        }
+
+
+def evaluate(state, stats):
+    """Leaf value of state, through stats when the search keeps any"""
+    if stats is None:
+        return state.heuristic()
+    return stats.evaluate(state)
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The backend modules import each other by their bare names, as the server
+# runs them from the backend directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,69 @@
+"""
+The bitboard engines against the list-based Connect4State, position by
+position and through the searches
+"""
+
+import random
+
+import pytest
+
+from state import Connect4State
+from bitboard import BitboardState, IncrementalBitboardState
+from context import SearchContext
+from benchmark.positions import load_positions
+import minimax
+import alpha_beta
+
+ENGINES = [BitboardState, IncrementalBitboardState]
+
+# The benchmark corpus plus a few seeded random games, every position with
+# the AI to move
+POSITIONS = [board for _, _, board in load_positions()]
+
+
+def _random_boards(count, seed=4):
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(count):
+        state = Connect4State()
+        for _ in range(2 * rng.randrange(0, 20)):
+            actions = state.available_actions()
+            if not actions:
+                break
+            state = state.transition(rng.choice(actions))
+        boards.append(state.board)
+    return boards
+
+
+POSITIONS += _random_boards(10)
+
+
+def _walk(state, plies):
+    """state and every position up to plies moves below it"""
+    yield state
+    if plies > 0:
+        for child in state.neighbors():
+            yield from _walk(child, plies - 1)
+
+
+@pytest.mark.parametrize('state_cls', ENGINES)
+@pytest.mark.parametrize('board', POSITIONS)
+def test_positions_match_list_state(state_cls, board):
+    for expected, state in zip(_walk(Connect4State(board), 2), _walk(state_cls(board), 2)):
+        assert state.board == expected.board
+        assert state.player == expected.player
+        assert state.key == expected.key
+        assert state.mirror_key == expected.mirror_key
+        assert state.available_actions() == expected.available_actions()
+        assert state.is_terminal() == expected.is_terminal()
+        assert state.terminal_score() == expected.terminal_score()
+        assert state.heuristic() == expected.heuristic()
+
+
+@pytest.mark.parametrize('engine', [minimax, alpha_beta])
+@pytest.mark.parametrize('state_cls', ENGINES)
+@pytest.mark.parametrize('board', POSITIONS)
+def test_searches_match_list_state(engine, state_cls, board):
+    expected = engine.minimax(board, SearchContext(3, Connect4State, keep_tree=False))
+    value, action, _, expanded = engine.minimax(board, SearchContext(3, state_cls, keep_tree=False))
+    assert (value, action, expanded) == (expected[0], expected[1], expected[3])
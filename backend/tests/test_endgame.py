@@ -0,0 +1,51 @@
+"""The exact endgame solver against a brute-force search to the end"""
+
+import random
+
+import pytest
+
+from bitboard import BitboardState
+from context import SearchContext
+from benchmark.positions import POSITIONS, board_from_moves
+from state import ROWS, COLS
+import endgame
+
+
+def _random_boards(empties, seed):
+    """Seeded random games stopped with `empties` cells left, AI to move"""
+    rng = random.Random(seed)
+    heights = [0] * COLS
+    moves = ''
+    while ROWS * COLS - len(moves) > empties:
+        col = rng.choice([c for c in range(COLS) if heights[c] < ROWS])
+        heights[col] += 1
+        moves += str(col)
+    return board_from_moves(moves)
+
+
+BOARDS = [_random_boards(empties, seed) for empties in (1, 2, 4, 6, 8, 9) for seed in range(3)]
+BOARDS.append(board_from_moves(POSITIONS['late-tight'][1]))
+
+
+def brute_force(state):
+    """ai_fours - human_fours of the full board under perfect play, no pruning"""
+    children = state.neighbors()
+    if not children:
+        score = state.terminal_score()
+        return score[1] - score[-1]
+    values = [brute_force(child) for child in children]
+    return max(values) if state.player == 1 else min(values)
+
+
+@pytest.mark.parametrize('board', BOARDS)
+def test_solve_matches_brute_force(board):
+    root = BitboardState(board)
+    value, action, _, _ = endgame.solve(board, SearchContext(state_cls=BitboardState))
+    assert value == brute_force(root)
+    assert brute_force(root.transition(action)) == value
+
+
+def test_solve_keeps_no_tree():
+    board = BOARDS[-1]
+    _, _, root, _ = endgame.solve(board, SearchContext(state_cls=BitboardState, keep_tree=True))
+    assert root.children == []
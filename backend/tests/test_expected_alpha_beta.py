@@ -0,0 +1,19 @@
+import pytest
+
+from bitboard import BitboardState
+from context import SearchContext
+from benchmark.positions import load_positions
+import expected_minimax
+import expected_alpha_beta
+
+POSITIONS = load_positions()
+
+
+@pytest.mark.parametrize('k', [1, 2, 3, 4])
+@pytest.mark.parametrize('name, board', [(name, board) for name, _, board in POSITIONS])
+def test_star1_matches_expected_minimax(name, board, k):
+    expected = expected_minimax.minimax(board, SearchContext(k, BitboardState))
+    value, action, root, expanded = expected_alpha_beta.minimax(board, SearchContext(k, BitboardState))
+    assert (value, action) == expected[:2]
+    assert root.expected_value == expected[2].expected_value
+    assert expanded <= expected[3]
@@ -0,0 +1,56 @@
+import threading
+
+from bitboard import BitboardState
+from benchmark.positions import load_positions
+from ponder import Ponderer, PonderRegistry
+
+BOARD = load_positions(['midgame'])[0][2]
+OPTIONS = ('minimax', True, 4)
+
+
+def test_concurrent_starts_leave_one_ponder_thread():
+    ponderer = Ponderer()
+    threads = []
+    barrier = threading.Barrier(8)
+
+    def start():
+        barrier.wait()
+        ponderer.start(BOARD, 6, OPTIONS, BitboardState, include_tree=False)
+        threads.append(ponderer.thread)
+
+    starters = [threading.Thread(target=start) for _ in range(8)]
+    for t in starters:
+        t.start()
+    for t in starters:
+        t.join()
+
+    live = ponderer.thread
+    assert all(not t.is_alive() for t in threads if t is not live)
+    ponderer.cancel()
+    assert not live.is_alive()
+    assert ponderer.stats()['started'] == 8
+
+
+def test_games_ponder_independently():
+    registry = PonderRegistry()
+    first, second = registry.get('first'), registry.get('second')
+    first.start(BOARD, 2, OPTIONS, BitboardState, include_tree=False)
+    first.thread.join()
+    second.start(BOARD, 6, OPTIONS, BitboardState, include_tree=False)
+
+    # A human move in the second game leaves the first game's results alone
+    registry.find('second').resolve([[0] * 7 for _ in range(6)])
+    assert registry.find('first').stats()['pending'] == 7
+    assert registry.find('unknown') is None
+    assert registry.stats()['games'] == 2
+
+
+def test_registry_forgets_least_recently_used_games():
+    registry = PonderRegistry(max_games=2)
+    oldest = registry.get('a')
+    oldest.start(BOARD, 6, OPTIONS, BitboardState, include_tree=False)
+    registry.get('b')
+    registry.get('c')
+    assert registry.find('a') is None
+    assert not oldest.thread.is_alive()
+    assert registry.stats()['started'] == 1
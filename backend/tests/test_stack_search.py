@@ -0,0 +1,33 @@
+"""The make/unmake search against alpha_beta.minimax() on the same positions"""
+
+import pytest
+
+from bitboard import BitboardState
+from context import SearchContext
+from stats import SearchStats
+from benchmark.positions import load_positions
+import alpha_beta
+import stack_search
+
+POSITIONS = [(name, board) for name, _, board in load_positions()]
+
+
+@pytest.mark.parametrize('k', [1, 2, 3, 4, 5])
+@pytest.mark.parametrize('name, board', POSITIONS)
+def test_matches_alpha_beta(name, board, k):
+    expected = alpha_beta.minimax(board, SearchContext(k, BitboardState, keep_tree=False))
+    value, action, root, expanded = stack_search.minimax(board, SearchContext(k, BitboardState))
+    assert (value, action, expanded) == (expected[0], expected[1], expected[3])
+    assert root.value == value
+    assert root.children == []
+
+
+@pytest.mark.parametrize('name, board', POSITIONS)
+def test_counts_the_same_nodes_and_cutoffs(name, board):
+    expected = SearchStats()
+    alpha_beta.minimax(board, SearchContext(4, BitboardState, keep_tree=False, stats=expected))
+    stats = SearchStats()
+    stack_search.minimax(board, SearchContext(4, BitboardState, stats=stats))
+    assert stats.nodes == expected.nodes
+    assert stats.cutoffs == expected.cutoffs
+    assert stats.heuristic_calls == expected.heuristic_calls
@@ -0,0 +1,35 @@
+"""Tournament reports, including a player entered twice"""
+
+from tournament import player_labels, report, schedule
+
+
+def _record(game, seats, score, opening=(3,), moves=2):
+    return {
+        'g': game,
+        'p': list(seats),
+        'opening': list(opening),
+        'moves': [[0, 0, 1.0, 10]] * moves,
+        'score': list(score),
+    }
+
+
+def test_labels_number_repeated_specs_only():
+    assert player_labels(['alpha_beta:2', 'minimax:2', 'alpha_beta:2']) == \
+        ['alpha_beta:2#1', 'minimax:2', 'alpha_beta:2#2']
+
+
+def test_duplicate_specs_are_reported_apart():
+    players = ['alpha_beta:2', 'alpha_beta:2']
+    header = {'players': players, 'games': 2}
+    records = [_record(game, seats, score)
+               for (game, _, seats), score in zip(schedule(players, 2), ([2, 1], [0, 0]))]
+
+    summary = report(header, records)
+
+    assert list(summary['players']) == ['alpha_beta:2#1', 'alpha_beta:2#2']
+    first, second = summary['players'].values()
+    assert (first['games'], first['wins'], first['draws'], first['losses']) == (2, 1, 1, 0)
+    assert (second['games'], second['wins'], second['draws'], second['losses']) == (2, 0, 1, 1)
+    assert first['moves'] == second['moves'] == 2
+    assert summary['pairings'] == [{'player': 'alpha_beta:2#1', 'opponent': 'alpha_beta:2#2',
+                                    'games': 2, 'wins': 1, 'draws': 1, 'losses': 0, 'score': 0.75}]
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from bitboard import BitboardState
+from context import SearchContext
+from benchmark.positions import load_positions
+from tree_codec import encode_tree, decode_tree, node_player_type
+import minimax
+import alpha_beta
+import expected_minimax
+import expected_alpha_beta
+
+BOARDS = {name: board for name, _, board in load_positions()}
+
+
+def tree_json(state, is_expectiminimax):
+    """The tree JSON of backend_server.state_to_tree_json(), as dicts"""
+    node = {
+        'value': state.value if state.value is not None else 0,
+        'player': node_player_type(state, is_expectiminimax),
+        'move': state.action,
+        'children': [tree_json(child, is_expectiminimax) for child in state.children],
+    }
+    if is_expectiminimax and state.expected_value is not None:
+        node['expected'] = state.expected_value
+    return node
+
+
+def _close(decoded, expected):
+    """decoded matches expected, floats to float32 precision"""
+    assert decoded.keys() == expected.keys()
+    for field in ('player', 'move'):
+        assert decoded[field] == expected[field]
+    for field in ('value', 'expected'):
+        if field in expected:
+            assert decoded[field] == pytest.approx(expected[field], rel=1e-6, abs=1e-2)
+    assert len(decoded['children']) == len(expected['children'])
+    for d, e in zip(decoded['children'], expected['children']):
+        _close(d, e)
+
+
+def _search(engine, board, k):
+    _, _, root, _ = engine.minimax(board, SearchContext(k, BitboardState))
+    return root
+
+
+@pytest.mark.parametrize('engine', [minimax, alpha_beta])
+@pytest.mark.parametrize('name', ['empty', 'mid-split', 'late-tight'])
+def test_minimax_round_trip_is_exact(engine, name):
+    root = _search(engine, BOARDS[name], 3)
+    assert decode_tree(encode_tree(root)) == tree_json(root, False)
+
+
+@pytest.mark.parametrize('engine', [expected_minimax, expected_alpha_beta])
+@pytest.mark.parametrize('name', ['empty', 'mid-split', 'late-tight'])
+def test_expectiminimax_round_trip(engine, name):
+    root = _search(engine, BOARDS[name], 3)
+    _close(decode_tree(encode_tree(root, True)), tree_json(root, True))
+
+
+def test_wide_values_round_trip():
+    root = BitboardState(BOARDS['empty'])
+    root.value = 10 ** 6
+    child = root.transition(3)
+    child.value = 1e18
+    assert decode_tree(encode_tree(root)) == tree_json(root, False)
+
+
+@pytest.mark.parametrize('engine, is_expectiminimax, ratio', [
+    (minimax, False, 15),
+    (expected_minimax, True, 8),
+])
+def test_binary_is_an_order_of_magnitude_smaller(engine, is_expectiminimax, ratio):
+    root = _search(engine, BOARDS['empty'], 4)
+    text = json.dumps(tree_json(root, is_expectiminimax))
+    assert len(text) >= ratio * len(encode_tree(root, is_expectiminimax))
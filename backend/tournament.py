@@ -0,0 +1,284 @@
+"""
+Engine-vs-engine self-play tournaments
+
+Every pair of players meets in `games` games over a process pool.  Games
+come in pairs that share a random opening (the first `opening_plies` moves)
+and swap who moves first, so deterministic engines still play varied
+games and neither side gets the better colour (an odd last game of a
+pairing has an opening of its own).  With slip > 0 a move lands
+in a random neighbouring column with that probability, as in the game
+model of the expectiminimax engines (0.4 there).
+
+The engines always search for player 1 (MAX), so the second player sees
+the board with its pieces flipped to 1.  A game ends when the board is full
+and is won by whoever has more fours.
+
+    python3 tournament.py alpha_beta:5 minimax:4 expected_alpha_beta:3 \\
+        --games 200 --out tournament.ndjson
+    python3 tournament.py --report tournament.ndjson
+
+The results file is NDJSON: a header line {players, games, openingPlies,
+slip, seed, engine}, then one line per game
+    {g, p: [first, second], opening: [col, ...],
+     moves: [[intended, played, timeMs, nodes], ...], score: [fours, fours]}
+where p holds indexes into players and moves alternates starting with
+players[p[0]].  A spec may be entered more than once; the report then
+names its copies spec#1, spec#2, ...
+"""
+
+import argparse
+import gzip
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from state import Connect4State, ROWS, COLS
+from engines import ENGINES, ALGORITHMS
+import parallel
+
+PERCENTILES = (50, 90, 99)
+
+
+def parse_player(spec):
+    """'alpha_beta:5' -> ('alpha_beta', 5)"""
+    algorithm, _, k = spec.partition(':')
+    if algorithm not in ALGORITHMS or not k.isdigit() or int(k) < 1:
+        raise ValueError(f"bad player {spec!r}, expected <algorithm>:<k> with algorithm one of {', '.join(ALGORITHMS)}")
+    return algorithm, int(k)
+
+
+def _open_columns(board):
+    return [c for c in range(COLS) if board[ROWS - 1][c] == 0]
+
+
+def _drop(board, col, piece):
+    for r in range(ROWS):
+        if board[r][col] == 0:
+            board[r][col] = piece
+            return
+
+
+def _slip(board, col, slip, rng):
+    """The column a move aimed at col lands in"""
+    if slip <= 0 or rng.random() >= slip:
+        return col
+    neighbours = [c for c in (col - 1, col + 1) if 0 <= c < COLS and board[ROWS - 1][c] == 0]
+    return rng.choice(neighbours) if neighbours else col
+
+
+def play_game(game, pair, seats, specs, opening_plies=2, slip=0.0, seed=0, engine='bitboard'):
+    """
+    Worker side: play one game between specs[seats[0]] (moving first, piece
+    1) and specs[seats[1]] (piece -1) and return its results line.  The
+    opening and slips come from a generator seeded with (seed, pair), so
+    both games of a pair share an opening.
+    """
+    state_cls = ENGINES[engine]
+    players = [parse_player(specs[seat]) for seat in seats]
+    rng = random.Random(f"{seed}:{pair}")
+    board = [[0] * COLS for _ in range(ROWS)]
+
+    opening = []
+    for ply in range(opening_plies):
+        col = rng.choice(_open_columns(board))
+        _drop(board, col, 1 if ply % 2 == 0 else -1)
+        opening.append(col)
+
+    moves = []
+    ply = opening_plies
+    while _open_columns(board):
+        piece = 1 if ply % 2 == 0 else -1
+        algorithm, k = players[ply % 2]
+        view = board if piece == 1 else [[-cell for cell in row] for row in board]
+        start = time.perf_counter()
+        _, action, _, expanded = ALGORITHMS[algorithm](view, k, state_cls, keep_tree=False)
+        elapsed = time.perf_counter() - start
+        played = _slip(board, action, slip, rng)
+        _drop(board, played, piece)
+        moves.append([action, played, round(elapsed * 1000, 2), expanded])
+        ply += 1
+
+    score = Connect4State(board).terminal_score()
+    return {
+        'g': game,
+        'p': list(seats),
+        'opening': opening,
+        'moves': moves,
+        'score': [score[1], score[-1]],
+    }
+
+
+def schedule(players, games):
+    """
+    (game, pair, seats) for every game: each pairing plays `games` games,
+    swapping seats every game.  pair numbers the games that share an
+    opening, two per pair within a pairing (an odd last game is alone).
+    """
+    game = 0
+    pairs_per_pairing = (games + 1) // 2
+    for pairing, (a, b) in enumerate(itertools.combinations(range(len(players)), 2)):
+        for i in range(games):
+            yield game, pairing * pairs_per_pairing + i // 2, (a, b) if i % 2 == 0 else (b, a)
+            game += 1
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't')
+    return open(path, mode)
+
+
+def run(players, games=100, out='tournament.ndjson', opening_plies=2, slip=0.0, seed=0,
+        engine='bitboard', workers=None, log=None):
+    """
+    Play the tournament and write the results file (gzip compressed when
+    out ends in .gz).  Games are written as they finish.  Returns report().
+    """
+    for spec in players:
+        parse_player(spec)
+    header = {
+        'players': list(players),
+        'games': games,
+        'openingPlies': opening_plies,
+        'slip': slip,
+        'seed': seed,
+        'engine': engine,
+    }
+    records = []
+    labels = player_labels(players)
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=parallel.pool_context())
+    with _open(out, 'w') as f, pool:
+        f.write(json.dumps(header) + '\n')
+        futures = [pool.submit(play_game, game, pair, seats, players, opening_plies, slip, seed, engine)
+                   for game, pair, seats in schedule(players, games)]
+        for done, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            records.append(record)
+            f.write(json.dumps(record, separators=(',', ':')) + '\n')
+            if log is not None:
+                log(f"game {done}/{len(futures)}: {labels[record['p'][0]]} vs "
+                    f"{labels[record['p'][1]]} {record['score'][0]}-{record['score'][1]}")
+    return report(header, records)
+
+
+def load(path):
+    """(header, records) of a results file"""
+    with _open(path, 'r') as f:
+        header = json.loads(f.readline())
+        records = [json.loads(line) for line in f if line.strip()]
+    return header, records
+
+
+def _percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def player_labels(players):
+    """
+    Report name of every player: its spec, with '#1', '#2', ... appended
+    when the same spec plays more than once (e.g. a self-play seat check)
+    """
+    seen = {}
+    labels = []
+    for spec in players:
+        seen[spec] = seen.get(spec, 0) + 1
+        labels.append(f"{spec}#{seen[spec]}" if players.count(spec) > 1 else spec)
+    return labels
+
+
+def report(header, records):
+    """
+    Per player: games, wins / draws / losses, score (wins + draws / 2 per
+    game), time per move percentiles and mean nodes per move.  Per pairing:
+    the same results from the first player's side.  Players are kept apart
+    by index and named by player_labels().
+    """
+    players = player_labels(header['players'])
+    results = [{'games': 0, 'wins': 0, 'draws': 0, 'losses': 0} for _ in players]
+    times = [[] for _ in players]
+    nodes = [[] for _ in players]
+    pairs = {}
+
+    for record in records:
+        seats = record['p']
+        first = record['score'][0] - record['score'][1]
+        for side, player in enumerate(seats):
+            outcome = first if side == 0 else -first
+            results[player]['games'] += 1
+            results[player]['wins' if outcome > 0 else 'losses' if outcome < 0 else 'draws'] += 1
+        for i, (_, _, ms, expanded) in enumerate(record['moves']):
+            player = seats[(len(record['opening']) + i) % 2]
+            times[player].append(ms)
+            nodes[player].append(expanded)
+
+        a, b = sorted(record['p'])
+        pair = pairs.setdefault((a, b), {'games': 0, 'wins': 0, 'draws': 0, 'losses': 0})
+        outcome = first if record['p'][0] == a else -first
+        pair['games'] += 1
+        pair['wins' if outcome > 0 else 'losses' if outcome < 0 else 'draws'] += 1
+
+    summary = {}
+    for player, label in enumerate(players):
+        entry = dict(results[player])
+        entry['score'] = round((entry['wins'] + entry['draws'] / 2) / entry['games'], 3) if entry['games'] else None
+        entry['moves'] = len(times[player])
+        entry['timeMs'] = {f'p{p}': _percentile(times[player], p) for p in PERCENTILES}
+        entry['timeMs']['max'] = max(times[player], default=None)
+        entry['timeMs']['mean'] = round(sum(times[player]) / len(times[player]), 2) if times[player] else None
+        entry['meanNodes'] = round(sum(nodes[player]) / len(nodes[player])) if nodes[player] else None
+        summary[label] = entry
+
+    pairings = []
+    for (a, b), pair in sorted(pairs.items()):
+        pairing = {'player': players[a], 'opponent': players[b], **pair}
+        pairing['score'] = round((pair['wins'] + pair['draws'] / 2) / pair['games'], 3)
+        pairings.append(pairing)
+    return {'players': summary, 'pairings': pairings}
+
+
+def format_report(summary):
+    lines = [f"{'player':24} {'games':>6} {'W':>5} {'D':>5} {'L':>5} {'score':>6} "
+             f"{'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'nodes':>9}"]
+    for spec, entry in summary['players'].items():
+        t = entry['timeMs']
+        lines.append(f"{spec:24} {entry['games']:6} {entry['wins']:5} {entry['draws']:5} {entry['losses']:5} "
+                     f"{entry['score'] if entry['score'] is not None else '-':>6} "
+                     f"{t['p50'] or 0:9.2f} {t['p90'] or 0:9.2f} {t['p99'] or 0:9.2f} {entry['meanNodes'] or 0:9}")
+    lines.append('')
+    for pairing in summary['pairings']:
+        lines.append(f"{pairing['player']} vs {pairing['opponent']}: +{pairing['wins']} ={pairing['draws']} "
+                     f"-{pairing['losses']} (score {pairing['score']})")
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Play engine-vs-engine Connect4 games and report win rates")
+    parser.add_argument('players', nargs='*', help=f"<algorithm>:<k>, algorithm one of {', '.join(ALGORITHMS)}")
+    parser.add_argument('--games', type=int, default=100, help="games per pairing")
+    parser.add_argument('--out', default='tournament.ndjson', help="results file (.gz to compress)")
+    parser.add_argument('--opening-plies', type=int, default=2, help="random moves before the engines take over")
+    parser.add_argument('--slip', type=float, default=0.0, help="probability a move lands in a neighbouring column")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--engine', choices=ENGINES, default='bitboard')
+    parser.add_argument('--workers', type=int, default=None, help="game processes (default: all cores)")
+    parser.add_argument('--report', metavar='FILE', help="only summarize an existing results file")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args()
+
+    if args.report:
+        summary = report(*load(args.report))
+    else:
+        if len(args.players) < 2:
+            parser.error("at least two players are needed")
+        try:
+            summary = run(args.players, args.games, args.out, args.opening_plies, args.slip, args.seed,
+                          args.engine, args.workers or os.cpu_count(), log=print)
+        except ValueError as e:
+            parser.error(str(e))
+    print(json.dumps(summary, indent=1) if args.json else format_report(summary))
@@ -0,0 +1,66 @@
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Replacement policies for a slot that already holds a different position
+REPLACE_ALWAYS = 'always'   # newest entry wins
+REPLACE_DEPTH = 'depth'     # keep whichever entry was searched deeper
+
+POLICIES = (REPLACE_ALWAYS, REPLACE_DEPTH)
+
+
+class TranspositionTable:
+    """
+    Fixed-size, direct-mapped table of search results keyed by the Zobrist
+    key of a state (state.key).  Each entry is (key, depth, value, flag, move)
+    where flag says whether value is EXACT, a LOWER bound or an UPPER bound.
+    """
+
+    def __init__(self, size=1 << 18, policy=REPLACE_DEPTH):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown replacement policy: {policy}")
+        self.size = size
+        self.policy = policy
+        self.entries = [None] * size
+
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def probe(self, key):
+        entry = self.entries[key % self.size]
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] != key:
+            self.collisions += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def store(self, key, depth, value, flag, move):
+        index = key % self.size
+        old = self.entries[index]
+        if old is not None and old[0] != key:
+            if self.policy == REPLACE_DEPTH and old[1] > depth:
+                return
+            self.replacements += 1
+        self.entries[index] = (key, depth, value, flag, move)
+        self.stores += 1
+
+    def clear(self):
+        self.entries = [None] * self.size
+
+    def stats(self):
+        return {
+            'size': self.size,
+            'policy': self.policy,
+            'hits': self.hits,
+            'misses': self.misses,
+            'collisions': self.collisions,
+            'stores': self.stores,
+            'replacements': self.replacements,
+        }
@@ -0,0 +1,195 @@
+"""
+Compact columnar binary encoding for search trees
+
+Layout (all little-endian):
+    header      magic b'C4TB', version (uint8), node count n (uint32),
+                flags (uint8), value typecode (one char)
+    node        uint8[n]          child count (bits 0-2), column played to
+                                  reach the node (bits 3-5, ROOT_MOVE for the
+                                  root) and index into NODE_TYPES (bits 6-7)
+    value       int16/int32/float32/float64[n]
+    expected    float32[n]        only if flags & HAS_EXPECTED; NaN when a
+                                  node has no expected value
+
+Nodes are stored in level order (breadth first, children in their
+original order), so the root is node 0 and the child counts are enough to
+rebuild the tree: the children of every node follow those of the nodes
+before it.
+Minimax values are whole numbers and take int16 when they fit, int32
+otherwise (float64 for anything else).  Expectiminimax values and expected
+values are weighted mixes, stored as float32: at most 69 * 1501 in size,
+they keep about two decimals, and the tree view shows one.
+"""
+
+import json
+import math
+import struct
+import sys
+from array import array
+
+MAGIC = b'C4TB'
+VERSION = 2
+HEADER = struct.Struct('<4sBIBc')
+
+HAS_EXPECTED = 1
+
+# Move field of the root node, which no move leads to
+ROOT_MOVE = 7
+
+NODE_TYPES = ('MAX', 'MIN', 'CHANCE', 'LEAF')
+
+
+def node_player_type(state, is_expectiminimax=False):
+    """
+    MAX / MIN / CHANCE / LEAF label of a node, as shown by the tree view
+    """
+    # state.player = 1 means MAX (AI), -1 means MIN (Human)
+    if is_expectiminimax and getattr(state, 'is_chance', False):
+        player_type = 'CHANCE'
+    elif state.player == 1:
+        player_type = 'MAX'
+    else:
+        player_type = 'MIN'
+
+    # Check if terminal node (leaf)
+    if len(state.children) == 0 or state.is_terminal():
+        player_type = 'LEAF'
+    return player_type
+
+
+def _little_endian(column):
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column.tobytes()
+
+
+def _value_column(values, is_expectiminimax):
+    """values in the narrowest column type that holds them (see the layout)"""
+    if is_expectiminimax:
+        return array('f', values)
+    for typecode in ('h', 'i'):
+        try:
+            return array(typecode, values)
+        except (OverflowError, TypeError):
+            pass
+    return array('d', values)
+
+
+def encode_tree(state, is_expectiminimax=False):
+    leaf, chance = NODE_TYPES.index('LEAF') << 6, NODE_TYPES.index('CHANCE') << 6
+    player_types = {1: NODE_TYPES.index('MAX') << 6, -1: NODE_TYPES.index('MIN') << 6}
+
+    # One level at a time, each column filled by a comprehension over the
+    # whole level.  The kinds are node_player_type()'s: a node with children
+    # is never terminal.
+    nodes = bytearray()
+    values = []
+    expected = []
+    level = [state]
+    moves = [ROOT_MOVE]
+    while level:
+        counts = [len(node.children) for node in level]
+        if is_expectiminimax and any(getattr(node, 'is_chance', False) for node in level):
+            kinds = [chance if count and getattr(node, 'is_chance', False) else player_types[node.player]
+                     for node, count in zip(level, counts)]
+        else:
+            kinds = [player_types[node.player] for node in level]
+        nodes += bytes([count | move << 3 | (kind if count else leaf)
+                        for count, move, kind in zip(counts, moves, kinds)])
+        values += [node.value for node in level]
+        if is_expectiminimax:
+            expected += [node.expected_value for node in level]
+
+        level = [child for node in level for child in node.children]
+        moves = [child.action for child in level]
+
+    if None in values:
+        values = [0 if value is None else value for value in values]
+    value_column = _value_column(values, is_expectiminimax)
+    columns = [value_column]
+    flags = 0
+    if is_expectiminimax:
+        flags |= HAS_EXPECTED
+        columns.append(array('f', [math.nan if value is None else value for value in expected]))
+
+    header = HEADER.pack(MAGIC, VERSION, len(nodes), flags, value_column.typecode.encode())
+    return header + bytes(nodes) + b''.join(_little_endian(column) for column in columns)
+
+
+def _read_column(buf, offset, typecode, n):
+    column = array(typecode)
+    size = column.itemsize * n
+    column.frombytes(buf[offset:offset + size])
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column, offset + size
+
+
+def decode_columns(buf):
+    """
+    Returns the raw columns as (counts, moves, types, values, expected), with
+    the packed node bytes split up and moves -1 for the root; expected is
+    None when the tree carries no expected values
+    """
+    magic, version, n, flags, value_code = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a C4TB tree buffer")
+
+    offset = HEADER.size
+    nodes = buf[offset:offset + n]
+    offset += n
+    counts = [b & 7 for b in nodes]
+    moves = [-1 if b >> 3 & 7 == ROOT_MOVE else b >> 3 & 7 for b in nodes]
+    types = [b >> 6 for b in nodes]
+    values, offset = _read_column(buf, offset, value_code.decode(), n)
+    expected = None
+    if flags & HAS_EXPECTED:
+        expected, offset = _read_column(buf, offset, 'f', n)
+    return counts, moves, types, values, expected
+
+
+def decode_tree(buf):
+    """
+    Rebuild the nested { value, player, move, children, expected? } dicts
+    produced by backend_server.state_to_tree_json()
+    """
+    counts, moves, types, values, expected = decode_columns(buf)
+
+    nodes = []
+    for i in range(len(counts)):
+        node = {
+            'value': values[i],
+            'player': NODE_TYPES[types[i]],
+            'move': None if moves[i] == -1 else moves[i],
+        }
+        if expected is not None and not math.isnan(expected[i]):
+            node['expected'] = expected[i]
+        if node['player'] == 'CHANCE' and counts[i]:
+            node['probability'] = 1.0 / counts[i]
+        nodes.append(node)
+
+    # In level order the children of every node follow those of the nodes
+    # before it
+    first = 1
+    for node, count in zip(nodes, counts):
+        node['children'] = nodes[first:first + count]
+        first += count
+
+    return nodes[0] if nodes else None
+
+
+def encode_response(result, tree):
+    """
+    Binary /api/move body: uint32 length of the JSON move result, the JSON
+    itself, then the encoded tree (empty when the move comes without one)
+    """
+    head = json.dumps(result).encode()
+    return struct.pack('<I', len(head)) + head + tree
+
+
+def decode_response(buf):
+    (length,) = struct.unpack_from('<I', buf, 0)
+    result = json.loads(buf[4:4 + length])
+    tree = buf[4 + length:]
+    result['tree'] = decode_tree(tree) if tree else None
+    return result